@@ -25,7 +25,10 @@ import AsyncStorage from '@react-native-async-storage/async-storage';
 // ═══════════════════════════════════════════════════════════════════════════
 import surahsData from './assets/surahs.json';
 import versesData from './assets/verses_v4.json';
+import wordFormsData from './assets/word_forms.json';
 import ihyaTafsirData from './assets/ihya_tafsir.json';
+import ihyaPassagesData from './assets/ihya_passages.json';
+import tajweedData from './assets/tajweed.json';
 
 // ═══════════════════════════════════════════════════════════════════════════
 // TAJWEED COLORS & RULES (from AlQuran APK)
@@ -40,104 +43,65 @@ const TAJWEED_COLORS = {
   madd: '#ff6600',        // Madd (elongation)
 };
 
-// Qalqala letters: ق ط ب ج د
-const QALQALA_LETTERS = ['ق', 'ط', 'ب', 'ج', 'د'];
-// Noon/Meem Sakinah indicators  
-const NOON_SAKINAH = 'نْ';
-const MEEM_SAKINAH = 'مْ';
+// Rule names indexed by the rule ids of tajweed.json
+const TAJWEED_RULES = tajweedData.rules;
 
-// Helper to apply Tajweed colors to Arabic text
-const renderTajweedText = (text, baseStyle, enabled = false) => {
-  if (!enabled || !text) return <Text style={baseStyle}>{text}</Text>;
+// Word-by-word forms; verses list their words as indexes into this table
+const WORD_FORMS = wordFormsData.forms.map(([arabic, translit, letters]) => ({ arabic, translit, letters }));
 
-  const chars = [...text];
-  return (
-    <Text style={baseStyle}>
-      {chars.map((char, i) => {
-        let color = null;
-        // Check for Qalqala letters
-        if (QALQALA_LETTERS.includes(char)) {
-          color = TAJWEED_COLORS.qalqala;
-        }
-        // Check for Noon with sukoon (rough approximation)
-        else if (char === 'ن' && chars[i + 1] === 'ْ') {
-          color = TAJWEED_COLORS.ghunna;
-        }
-        // Check for Meem with sukoon
-        else if (char === 'م' && chars[i + 1] === 'ْ') {
-          color = TAJWEED_COLORS.ghunna;
-        }
-        // Check for Madd (elongation mark)
-        else if (char === 'ٓ' || char === 'ٰ' || char === 'آ') {
-          color = TAJWEED_COLORS.madd;
-        }
-
-        return color ? (
-          <Text key={i} style={{ color, fontWeight: '600' }}>{char}</Text>
-        ) : char;
-      })}
-    </Text>
-  );
-};
+// Ihya entries quoted under several verses are stored once; a verse's
+// entry {passage: id} refers to ihya_passages.json
+const IHYA_PASSAGES = ihyaPassagesData.passages;
+const resolveIhyaEntry = (entry) => (entry.passage !== undefined ? IHYA_PASSAGES[entry.passage] : entry);
 
-// Helper to clean transliteration (data is RTL-reversed with Arabic diacritics embedded)
-const cleanTranslit = (translit: string): string => {
-  if (!translit) return '';
-  // Remove Arabic diacritics (harakat)
-  const cleaned = translit.replace(/[\u064B-\u0652\u0670\u0640\u0671]/g, '');
-  // Reverse the string (data is stored RTL)
-  return [...cleaned].reverse().join('');
+// Global verse id of the first verse of every surah
+const SURAH_START_IDS = (() => {
+  const starts = [];
+  let vid = 1;
+  surahsData.forEach((s) => {
+    starts[s.number] = vid;
+    vid += s.verses;
+  });
+  return starts;
+})();
+
+// Build-time tajweed spans of a verse: per corpus word, a list of
+// [start, length, rule] spans with word-relative starts (empty where the build could not match
+// the verse text to the words)
+const tajweedSpansByWord = (surah, ayah) => tajweedData.verses[SURAH_START_IDS[surah] + ayah - 1] || [];
+
+// Helper to apply Tajweed colors to [start, length, rule] spans
+const renderTajweedText = (text, baseStyle, enabled = false, spans = []) => {
+  if (!enabled || !text || !spans.length) return <Text style={baseStyle}>{text}</Text>;
+
+  const parts = [];
+  let pos = 0;
+  spans.forEach(([start, length, rule], i) => {
+    if (start > pos) parts.push(text.slice(pos, start));
+    parts.push(
+      <Text key={i} style={{ color: TAJWEED_COLORS[TAJWEED_RULES[rule]], fontWeight: '600' }}>
+        {text.slice(start, start + length)}
+      </Text>
+    );
+    pos = start + length;
+  });
+  if (pos < text.length) parts.push(text.slice(pos));
+  return <Text style={baseStyle}>{parts}</Text>;
 };
 
-// Helper to render Arabic and Transliteration letter-by-letter aligned
-const renderLetterByLetter = (arabic, translit, arabicStyle, translitStyle, isCurrentWord = false) => {
-  // Clean and reverse the transliteration first
-  const cleanedTranslit = cleanTranslit(translit);
-
-  // Arabic diacritics pattern (harakat that attach to letters)
-  const arabicDiacritics = /[\u064B-\u0652\u0670\u0640\u0671]/;
-
-  // Group Arabic chars: base letter + following diacritics
-  const arabicChars = [...(arabic || '')];
+// Helper to render Arabic and Transliteration letter-by-letter aligned.
+// letters is the build's flat [arabic length, latin, ...] alignment of the word
+const renderLetterByLetter = (arabic, letters, arabicStyle, translitStyle, isCurrentWord = false) => {
   const arabicGroups: string[] = [];
-  let currentGroup = '';
-
-  for (const char of arabicChars) {
-    if (arabicDiacritics.test(char) && currentGroup) {
-      currentGroup += char; // Add diacritic to current group
-    } else {
-      if (currentGroup) arabicGroups.push(currentGroup);
-      currentGroup = char;
-    }
-  }
-  if (currentGroup) arabicGroups.push(currentGroup);
-
-  // Group Latin digraphs: th, kh, sh, gh, dh, ṭh, etc. should stay together
-  const latinDigraphs = ['th', 'kh', 'sh', 'gh', 'dh', 'zh', 'ḥ', 'ṣ', 'ṭ', 'ḍ', 'ẓ', 'ā', 'ū', 'ī', 'ʿ', 'ʾ'];
   const translitGroups: string[] = [];
-  let i = 0;
-  const translitLower = cleanedTranslit.toLowerCase();
-
-  while (i < cleanedTranslit.length) {
-    // Check for digraphs (2-char combinations)
-    const twoChar = cleanedTranslit.slice(i, i + 2).toLowerCase();
-    if (i + 1 < cleanedTranslit.length && latinDigraphs.includes(twoChar)) {
-      translitGroups.push(cleanedTranslit.slice(i, i + 2));
-      i += 2;
-    } else {
-      // Single special char or regular char
-      const oneChar = cleanedTranslit[i];
-      if (latinDigraphs.includes(oneChar.toLowerCase())) {
-        translitGroups.push(oneChar);
-      } else {
-        translitGroups.push(oneChar);
-      }
-      i++;
-    }
+  let pos = 0;
+  for (let i = 0; i + 1 < (letters || []).length; i += 2) {
+    arabicGroups.push((arabic || '').slice(pos, pos + letters[i]));
+    translitGroups.push(letters[i + 1]);
+    pos += letters[i];
   }
 
-  // Create pairs - align transliteration groups with Arabic groups
-  const pairCount = Math.max(arabicGroups.length, translitGroups.length);
+  const pairCount = arabicGroups.length;
 
   return (
     <View style={{ flexDirection: 'row-reverse', alignItems: 'flex-start', flexWrap: 'wrap', justifyContent: 'center' }}>
@@ -639,6 +603,7 @@ export default function App() {
           onScrollToIndexFailed={() => { }}
           renderItem={({ item }) => {
             const isPlaying = playbackStatus.currentVerse === `${selectedSurah}:${item.ayah}`;
+            const wordTajweed = settings.tajweed ? tajweedSpansByWord(selectedSurah, item.ayah) : [];
             return (
               <>
                 <Animated.View style={[
@@ -664,7 +629,8 @@ export default function App() {
 
                   {/* Word by Word Flow - Letter-by-letter aligned */}
                   <View style={[styles.wordContainer, { backgroundColor: theme.wbwBg }]}>
-                    {item.words && item.words.map((word, idx) => {
+                    {item.words && item.words.map((formId, idx) => {
+                      const word = WORD_FORMS[formId];
                       const isCurrentVerse = playbackStatus.currentVerse === `${selectedSurah}:${item.ayah}`;
                       const isCurrentWord = isCurrentVerse && idx === playingWordIndex;
 
@@ -685,7 +651,7 @@ export default function App() {
                           {settings.showTransliteration ? (
                             renderLetterByLetter(
                               word.arabic,
-                              word.translit,
+                              word.letters,
                               [styles.wordArabic, { color: theme.arabic, fontSize: settings.fontSize }],
                               [styles.wordTranslit, { color: theme.primary }],
                               isCurrentWord
@@ -695,7 +661,8 @@ export default function App() {
                               renderTajweedText(
                                 word.arabic,
                                 [styles.wordArabic, { color: theme.arabic, fontSize: settings.fontSize }],
-                                true
+                                true,
+                                wordTajweed[idx]
                               ) :
                               renderArabicWithAllah(
                                 word.arabic,
@@ -737,7 +704,7 @@ export default function App() {
 
   const renderDetail = () => {
     if (!selectedVerse) return null;
-    const tafsirEntry = ihyaTafsirData[`${selectedVerse.surah}:${selectedVerse.ayah}`];
+    const tafsirEntry = ihyaTafsirData[`${selectedVerse.surah}:${selectedVerse.ayah}`]?.map(resolveIhyaEntry);
 
     return (
       <LinearGradient colors={theme.bg} style={styles.container}>
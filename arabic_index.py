@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Normalized Arabic word index (arabic_index.db).
+
+Every corpus.db word, and every one of its ar1..ar5 segments, is reduced
+with arabic_text.normalize_arabic and mapped to a posting list of
+(verse id, word number) positions. Forms live in a WITHOUT ROWID table keyed
+by (kind, form), so exact and prefix lookups are B-tree range scans rather
+than a scan over the 77k vocalized words.
+
+A posting is packed as vid << 8 | word; a list is the little-endian u32
+array of its sorted postings.
+"""
+import os
+import sqlite3
+import sys
+from array import array
+
+from arabic_text import normalize_arabic
+
+KIND_WORD = 0
+KIND_SEGMENT = 1
+KINDS = {"word": KIND_WORD, "segment": KIND_SEGMENT}
+
+WORD_BITS = 8
+WORD_MASK = (1 << WORD_BITS) - 1
+
+SCHEMA = """
+    CREATE TABLE forms (
+        kind INTEGER NOT NULL,
+        form TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        postings BLOB NOT NULL,
+        PRIMARY KEY (kind, form)
+    ) WITHOUT ROWID;
+"""
+
+
+def pack_posting(vid, word):
+    if not 0 <= word <= WORD_MASK:
+        raise ValueError(f"word number {word} does not fit in a posting")
+    return vid << WORD_BITS | word
+
+
+def unpack_posting(posting):
+    return posting >> WORD_BITS, posting & WORD_MASK
+
+
+def _encode(postings):
+    data = array('I', postings)
+    if sys.byteorder != 'little':
+        data.byteswap()
+    return data.tobytes()
+
+
+def _decode(blob):
+    data = array('I')
+    data.frombytes(blob)
+    if sys.byteorder != 'little':
+        data.byteswap()
+    return data
+
+
+def build_arabic_index(path, index, corpus_rows):
+    """
+    Write arabic_index.db from (sura, ayah, word, ar1, .., ar5) rows in
+    (sura, ayah, word) order. Returns (word forms, segment forms).
+    """
+    postings = ({}, {})
+    for row in corpus_rows:
+        vid = index.vid(row[0], row[1])
+        if not vid:
+            continue
+        posting = pack_posting(vid, row[2])
+        segments = [seg for seg in row[3:] if seg]
+        word = normalize_arabic("".join(segments))
+        if word:
+            postings[KIND_WORD].setdefault(word, []).append(posting)
+        seen = set()
+        for seg in segments:
+            form = normalize_arabic(seg)
+            if form and form not in seen:
+                seen.add(form)
+                postings[KIND_SEGMENT].setdefault(form, []).append(posting)
+
+    tmp_path = path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    conn.executescript(SCHEMA)
+    with conn:
+        for kind, forms in enumerate(postings):
+            conn.executemany(
+                "INSERT INTO forms VALUES (?, ?, ?, ?)",
+                ((kind, form, len(p), _encode(p)) for form, p in sorted(forms.items())),
+            )
+    conn.execute("VACUUM")
+    conn.close()
+    os.replace(tmp_path, path)
+    return len(postings[KIND_WORD]), len(postings[KIND_SEGMENT])
+
+
+def _prefix_end(prefix):
+    # Smallest string greater than every string starting with prefix
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class ArabicIndex:
+    """Lookups over arabic_index.db; queries may be vocalized or not"""
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def lookup(self, query, kind="word"):
+        """Sorted postings of the exact normalized form of query"""
+        form = normalize_arabic(query.strip())
+        row = self.conn.execute(
+            "SELECT postings FROM forms WHERE kind = ? AND form = ?", (KINDS[kind], form)
+        ).fetchone()
+        return _decode(row[0]) if row else array('I')
+
+    def prefix(self, query, kind="word", limit=50):
+        """(form, count) of the most frequent forms starting with query"""
+        form = normalize_arabic(query.strip())
+        if not form:
+            return []
+        return self.conn.execute(
+            "SELECT form, count FROM forms WHERE kind = ? AND form >= ? AND form < ? "
+            "ORDER BY count DESC, form LIMIT ?",
+            (KINDS[kind], form, _prefix_end(form), limit),
+        ).fetchall()
+
+    def prefix_postings(self, query, kind="word"):
+        """Sorted postings of every form starting with query"""
+        form = normalize_arabic(query.strip())
+        if not form:
+            return array('I')
+        merged = set()
+        for (blob,) in self.conn.execute(
+            "SELECT postings FROM forms WHERE kind = ? AND form >= ? AND form < ?",
+            (KINDS[kind], form, _prefix_end(form)),
+        ):
+            merged.update(_decode(blob))
+        return array('I', sorted(merged))
+
+    def search(self, query, kind="word", prefix=True):
+        """
+        Verses containing every term of query, as {vid: [word numbers]}.
+
+        With prefix=True the last term matches as a prefix, for as-you-type
+        search. The smallest posting list is intersected first.
+        """
+        terms = query.split()
+        if not terms:
+            return {}
+        lists = [self.lookup(term, kind) for term in terms[:-1]]
+        lists.append(self.prefix_postings(terms[-1], kind) if prefix else self.lookup(terms[-1], kind))
+        lists.sort(key=len)
+        verses = None
+        for postings in lists:
+            vids = {p >> WORD_BITS for p in postings}
+            verses = vids if verses is None else verses & vids
+            if not verses:
+                return {}
+        hits = {}
+        for postings in lists:
+            for p in postings:
+                vid = p >> WORD_BITS
+                if vid in verses:
+                    hits.setdefault(vid, set()).add(p & WORD_MASK)
+        return {vid: sorted(hits[vid]) for vid in sorted(hits)}
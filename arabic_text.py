@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Text helpers shared by the pipeline stages.
+"""
+import re
+
+# Harakat, superscript alef, tatweel and alef wasla, stripped from the Latin
+# of every aligned letter
+TRANSLIT_MARKS = re.compile("[\u064B-\u0652\u0670\u0640\u0671]")
+
+
+# Tashkeel, Quranic annotation marks, superscript alef, tatweel and the
+# standalone hamza are dropped; letter variants are folded to one form
+ARABIC_MARKS = re.compile("[\u0610-\u061A\u064B-\u065F\u0670\u06D6-\u06ED\u0640\u0621]")
+ARABIC_FOLDS = str.maketrans({
+    "\u0671": "\u0627",  # alef wasla
+    "\u0623": "\u0627",  # alef with hamza above
+    "\u0625": "\u0627",  # alef with hamza below
+    "\u0622": "\u0627",  # alef with madda
+    "\u0672": "\u0627",  # alef with wavy hamza above
+    "\u0673": "\u0627",  # alef with wavy hamza below
+    "\u0675": "\u0627",  # high hamza alef
+    "\u0649": "\u064A",  # alef maksura
+    "\u06CC": "\u064A",  # farsi yeh
+    "\u0626": "\u064A",  # yeh with hamza
+    "\u0624": "\u0648",  # waw with hamza
+    "\u0629": "\u0647",  # teh marbuta
+    "\u06A9": "\u0643",  # keheh
+})
+
+
+def normalize_arabic(text):
+    """Search form of Arabic text: unvocalized, with alif/ya/hamza variants folded"""
+    if not text:
+        return ""
+    return ARABIC_MARKS.sub("", text).translate(ARABIC_FOLDS)
+
+
+# Marks that belong to the letter before them: tashkeel, superscript alef,
+# Quranic annotation marks and tatweel
+LETTER_MARKS = re.compile("[\u064B-\u065F\u0670\u06D6-\u06ED\u0640]")
+# Pause and sajda signs: written on the letter but not mirrored in words.db `en`
+PAUSE_MARKS = re.compile("[\u06D6-\u06DC\u06E9]")
+# One transliteration unit: a digraph, ain as stored (ع + ʿ), a hamza with its short
+# vowel, or one character
+LATIN_UNIT = re.compile("th|kh|sh|gh|dh|zh|\u0639\u02BF|\u02BE[aiu]|.", re.S)
+
+
+def letter_groups(arabic):
+    """Base letters of a word with the marks that follow each"""
+    groups = []
+    for ch in arabic or "":
+        if groups and LETTER_MARKS.match(ch):
+            groups[-1] += ch
+        else:
+            groups.append(ch)
+    return groups
+
+
+def translit_segments(translit):
+    """
+    (latin run, marks) pieces of a words.db `en` value in reading order. The
+    raw value mirrors the marks of the Arabic letters, so every run of marks
+    closes the Latin of one marked letter; a final run may have no marks.
+    """
+    segments, run, marks = [], "", ""
+    for ch in (translit or "")[::-1]:
+        if LETTER_MARKS.match(ch):
+            marks += ch
+            continue
+        if marks:
+            segments.append((run, marks))
+            run, marks = "", ""
+        run += ch
+    if run or marks:
+        segments.append((run, marks))
+    return segments
+
+
+def _spread(units, latin, first, anchor):
+    """Units of one Latin run onto groups first..anchor (anchor last, if any)"""
+    if anchor is not None:
+        latin[anchor] = units.pop() if units else ""
+    pending = range(first, anchor if anchor is not None else len(latin))
+    for i, j in enumerate(pending):
+        latin[j] = units[i] if i < len(units) else ""
+    rest = "".join(units[len(pending):])
+    if rest:
+        target = pending[-1] if pending else (anchor if anchor is not None else len(latin) - 1)
+        latin[target] = latin[target] + rest if pending or anchor is None else rest + latin[target]
+
+
+def mark_anchors(groups, segments):
+    """
+    (indexes of the marked Arabic groups, their Latin runs) if the marks of
+    letter_groups() and translit_segments() line up one to one, else None
+    """
+    marked = [i for i, group in enumerate(groups) if len(PAUSE_MARKS.sub("", group)) > 1]
+    anchored = [run for run, marks in segments if marks]
+    if not groups or len(marked) != len(anchored) or len(segments) - len(anchored) > 1:
+        return None
+    return marked, anchored
+
+
+def align_letters(arabic, translit):
+    """
+    [(Arabic letter group, Latin group)] of one word, Latin cleaned and in
+    reading order. Marked Arabic letters are matched to the mark runs of the
+    transliteration; unmarked letters (long vowels, silent letters) share
+    the Latin before the next marked letter, one unit each. Words whose
+    marks do not line up fall back to pairing groups by position.
+    """
+    groups = letter_groups(arabic)
+    segments = translit_segments(translit)
+    anchors = mark_anchors(groups, segments)
+    if anchors is None:
+        units = LATIN_UNIT.findall("".join(run for run, _ in segments))
+        count = max(len(groups), len(units))
+        return [(groups[i] if i < len(groups) else "", TRANSLIT_MARKS.sub("", units[i]) if i < len(units) else "")
+                for i in range(count)]
+    marked, anchored = anchors
+    latin = [""] * len(groups)
+    first = 0
+    for run, anchor in zip(anchored, marked):
+        _spread(LATIN_UNIT.findall(run), latin, first, anchor)
+        first = anchor + 1
+    trailing = segments[-1][0] if segments and not segments[-1][1] else ""
+    if trailing or first < len(groups):
+        _spread(LATIN_UNIT.findall(trailing), latin, first, None)
+    return [(group, TRANSLIT_MARKS.sub("", text)) for group, text in zip(groups, latin)]
+
+
+def word_letters(arabic, translit):
+    """
+    (clean transliteration, letters) of one word, where letters is the flat
+    list [Arabic group length, Latin, ...] written to verses_v4.json. The
+    lengths count characters of the Arabic word, equal to JavaScript string
+    indices.
+    """
+    pairs = align_letters(arabic, translit)
+    letters = []
+    for group, latin in pairs:
+        letters += [len(group), latin]
+    return "".join(latin for _, latin in pairs), letters
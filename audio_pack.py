@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+Per-surah audio packs with a byte-offset / time seek index.
+
+Takes a directory of per-ayah MP3s of one reciter, named by global ayah id
+as on the CDN (262.mp3) or by sura and ayah (002255.mp3), and concatenates
+the MPEG audio frames of each surah into one file:
+
+    OUT_DIR/ayah_ids.json        first global ayah id of every surah
+    OUT_DIR/<reciter>/001.mp3    frames of 1:1 .. 1:7, back to back
+    OUT_DIR/<reciter>/index.json per surah: pack file, size, duration and
+                                 [offset, bytes, startMs, durationMs] per ayah
+
+ID3 tags and the Xing / Info header frame of every input are dropped, so
+a pack is a plain frame stream: any ayah offset is a frame boundary where
+playback or a range request can start, and times come from the frame
+sample counts rather than from bitrate estimates. Surahs whose inputs did
+not change (name, size and mtime) are not rebuilt; surahs with a missing
+ayah are skipped.
+
+`fixture` writes silent but valid per-ayah MP3s (ID3v2 tag, Info frame,
+128 kbps frames) for trying the builder without real recordings.
+"""
+import argparse
+import json
+import os
+import random
+from bisect import bisect_right
+
+from build_cache import value_digest
+from source_catalog import SourceCatalog
+from verse_index import VerseIndex
+
+# Reciter ids of RECITERS in App.tsx
+RECITERS = {
+    "minshawi": "Minshawi Murattal",
+    "abdulbasit": "Abdul Basit",
+    "alafasy": "Mishary Alafasy",
+    "husary": "Al-Husary",
+}
+INDEX_NAME = "index.json"
+AYAH_IDS_NAME = "ayah_ids.json"
+
+# MPEG audio frame header tables, indexed by version id (0 = 2.5, 2 = 2, 3 = 1)
+SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+# kbps by (MPEG-1?, layer), layer 3 = Layer I, 2 = Layer II, 1 = Layer III
+BITRATES = {
+    (True, 3): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (True, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (True, 1): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (False, 3): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (False, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (False, 1): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+
+
+def frame_info(data, pos):
+    """(frame bytes, samples, sample rate) of the frame header at pos, or None"""
+    if pos + 4 > len(data) or data[pos] != 0xFF or data[pos + 1] & 0xE0 != 0xE0:
+        return None
+    version = (data[pos + 1] >> 3) & 3
+    layer = (data[pos + 1] >> 1) & 3
+    bitrate_index = data[pos + 2] >> 4
+    rate_index = (data[pos + 2] >> 2) & 3
+    if version == 1 or layer == 0 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    mpeg1 = version == 3
+    bitrate = BITRATES[mpeg1, layer][bitrate_index] * 1000
+    sample_rate = SAMPLE_RATES[version][rate_index]
+    padding = (data[pos + 2] >> 1) & 1
+    if layer == 3:
+        return (12 * bitrate // sample_rate + padding) * 4, 384, sample_rate
+    if layer == 1 and not mpeg1:
+        return 72 * bitrate // sample_rate + padding, 576, sample_rate
+    return 144 * bitrate // sample_rate + padding, 1152, sample_rate
+
+
+def _is_info_frame(data, pos, length):
+    """True for the Xing / Info / VBRI header frame some encoders put first"""
+    mpeg1 = (data[pos + 1] >> 3) & 3 == 3
+    mono = data[pos + 3] >> 6 == 3
+    side_info = (17 if mono else 32) if mpeg1 else (9 if mono else 17)
+    frame = data[pos:pos + length]
+    return frame[4 + side_info:8 + side_info] in (b"Xing", b"Info") or frame[36:40] == b"VBRI"
+
+
+def audio_frames(data):
+    """
+    [(offset, bytes, samples)] of the audio frames of an MP3 and its sample
+    rate. ID3v2 / ID3v1 tags, the Xing / Info frame and bytes that are not a
+    frame are skipped; a change of sample rate raises ValueError.
+    """
+    pos, end = 0, len(data)
+    if data[:3] == b"ID3" and len(data) >= 10:
+        size = (data[6] & 0x7F) << 21 | (data[7] & 0x7F) << 14 | (data[8] & 0x7F) << 7 | data[9] & 0x7F
+        pos = 10 + size + (10 if data[5] & 0x10 else 0)
+    if end - pos >= 128 and data[end - 128:end - 125] == b"TAG":
+        end -= 128
+    frames, sample_rate = [], None
+    while pos < end:
+        info = frame_info(data, pos)
+        if info is None or pos + info[0] > end:
+            pos = data.find(b"\xff", pos + 1, end)
+            if pos < 0:
+                break
+            continue
+        length, samples, rate = info
+        if sample_rate is None:
+            sample_rate = rate
+            if _is_info_frame(data, pos, length):
+                pos += length
+                continue
+        elif rate != sample_rate:
+            raise ValueError(f"sample rate changes from {sample_rate} to {rate} at byte {pos}")
+        frames.append((pos, length, samples))
+        pos += length
+    return frames, sample_rate
+
+
+def ayah_path(audio_dir, vid, sura, ayah):
+    """The input file of one ayah under either naming, or None"""
+    for name in (f"{vid}.mp3", f"{sura:03}{ayah:03}.mp3"):
+        path = os.path.join(audio_dir, name)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def build_surah_pack(paths, pack_path):
+    """
+    Concatenate the frames of the ayah files in paths into pack_path; returns
+    its index entry without the file name.
+    """
+    out = bytearray()
+    ayahs = []
+    sample_rate, samples_done = None, 0
+    for path in paths:
+        with open(path, 'rb') as f:
+            data = f.read()
+        frames, rate = audio_frames(data)
+        if not frames:
+            raise ValueError(f"{path} has no MPEG audio frames")
+        if sample_rate is None:
+            sample_rate = rate
+        elif rate != sample_rate:
+            raise ValueError(f"{path} is {rate} Hz, earlier ayahs are {sample_rate} Hz")
+        offset = len(out)
+        start_ms = samples_done * 1000 // sample_rate
+        for pos, length, samples in frames:
+            out += data[pos:pos + length]
+            samples_done += samples
+        ayahs += [offset, len(out) - offset, start_ms, samples_done * 1000 // sample_rate - start_ms]
+    with open(pack_path + ".tmp", 'wb') as f:
+        f.write(out)
+    os.replace(pack_path + ".tmp", pack_path)
+    return {"bytes": len(out), "sampleRate": sample_rate,
+            "durationMs": samples_done * 1000 // sample_rate, "ayahs": ayahs}
+
+
+def load_index(pack_dir):
+    """index.json of a reciter's pack directory, or None"""
+    try:
+        with open(os.path.join(pack_dir, INDEX_NAME), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_ayah_ids(out_dir, index):
+    """ayah_ids.json: surahStarts[n - 1] is the global id of n:1, the last entry one past 114:6"""
+    path = os.path.join(out_dir, AYAH_IDS_NAME)
+    with open(path + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump({"verses": len(index), "surahStarts": list(index.starts)}, f, separators=(',', ':'))
+    os.replace(path + ".tmp", path)
+
+
+def build_packs(reciter, audio_dir, out_dir, index, surahs=None):
+    """
+    Build the packs of `reciter` from audio_dir into out_dir/<reciter> for
+    the given surah numbers (default all). Returns (built, reused, skipped)
+    surah lists; skipped surahs miss at least one ayah file.
+    """
+    if reciter not in RECITERS:
+        raise ValueError(f"unknown reciter {reciter!r}, expected one of {', '.join(RECITERS)}")
+    pack_dir = os.path.join(out_dir, reciter)
+    os.makedirs(pack_dir, exist_ok=True)
+    write_ayah_ids(out_dir, index)
+    previous = (load_index(pack_dir) or {}).get("surahs", {})
+    targets = surahs or range(1, index.surah_count + 1)
+    entries = {sura: entry for sura, entry in previous.items() if int(sura) not in targets}
+    built, reused, skipped = [], [], []
+    for sura in targets:
+        vids = index.surah_range(sura)
+        paths = [ayah_path(audio_dir, vid, sura, vid - vids.start + 1) for vid in vids]
+        if None in paths:
+            skipped.append(sura)
+            continue
+        stats = [os.stat(path) for path in paths]
+        sources = value_digest([[os.path.basename(p), s.st_size, s.st_mtime_ns] for p, s in zip(paths, stats)])
+        name = f"{sura:03}.mp3"
+        entry = previous.get(str(sura))
+        pack_path = os.path.join(pack_dir, name)
+        if (entry and entry.get("sources") == sources and os.path.exists(pack_path)
+                and os.path.getsize(pack_path) == entry["bytes"]):
+            entries[str(sura)] = entry
+            reused.append(sura)
+            continue
+        entries[str(sura)] = {"file": name, "sources": sources, **build_surah_pack(paths, pack_path)}
+        built.append(sura)
+
+    path = os.path.join(pack_dir, INDEX_NAME)
+    with open(path + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump({"reciter": reciter, "surahs": dict(sorted(entries.items(), key=lambda e: int(e[0])))},
+                  f, separators=(',', ':'))
+    os.replace(path + ".tmp", path)
+    return built, reused, skipped
+
+
+class AudioPackIndex:
+    """Ayah <-> (pack file, byte range, time) lookups over a reciter's index.json"""
+
+    def __init__(self, pack_dir):
+        index = load_index(pack_dir)
+        if index is None:
+            raise ValueError(f"{pack_dir} has no {INDEX_NAME}")
+        self.pack_dir = pack_dir
+        self.reciter = index["reciter"]
+        self.surahs = {int(sura): entry for sura, entry in index["surahs"].items()}
+        self._starts = {sura: entry["ayahs"][2::4] for sura, entry in self.surahs.items()}
+
+    def locate(self, sura, ayah):
+        """(pack path, byte offset, bytes, start ms, duration ms) of sura:ayah"""
+        entry = self.surahs.get(sura)
+        if entry is None or not 1 <= ayah <= len(entry["ayahs"]) // 4:
+            raise KeyError(f"{sura}:{ayah}")
+        offset, length, start_ms, duration_ms = entry["ayahs"][(ayah - 1) * 4:ayah * 4]
+        return os.path.join(self.pack_dir, entry["file"]), offset, length, start_ms, duration_ms
+
+    def ayah_at(self, sura, ms):
+        """The ayah of a surah pack playing at ms"""
+        starts = self._starts.get(sura)
+        if starts is None:
+            raise KeyError(sura)
+        return max(1, bisect_right(starts, ms))
+
+
+def _mp3_frame(bitrate, sample_rate, padding, payload=b""):
+    """One MPEG-1 Layer III joint-stereo frame; a zero payload decodes as silence"""
+    rate_index = SAMPLE_RATES[3].index(sample_rate)
+    bitrate_index = BITRATES[True, 1].index(bitrate // 1000)
+    header = bytes((0xFF, 0xFB, bitrate_index << 4 | rate_index << 2 | padding << 1, 0x40))
+    length = 144 * bitrate // sample_rate + padding
+    return header + payload + bytes(length - 4 - len(payload))
+
+
+def write_test_audio(audio_dir, index, surahs=None, naming="global", seed=0,
+                     bitrate=128000, sample_rate=44100, seconds=(0.5, 3.0)):
+    """Silent per-ayah MP3s of random length for the given surahs; returns the file count"""
+    rng = random.Random(seed)
+    os.makedirs(audio_dir, exist_ok=True)
+    remainder = 144 * bitrate % sample_rate
+    count = 0
+    for sura in surahs or range(1, index.surah_count + 1):
+        vids = index.surah_range(sura)
+        for vid in vids:
+            ayah = vid - vids.start + 1
+            title = b"\x03" + f"{sura}:{ayah}".encode()
+            tag = b"TIT2" + len(title).to_bytes(4, 'big') + bytes(2) + title
+            out = bytearray(b"ID3\x04\x00\x00" + bytes((0, 0, 0, len(tag))) + tag)
+            out += _mp3_frame(bitrate, sample_rate, 0, bytes(32) + b"Info" + bytes(4))
+            acc = 0
+            for _ in range(max(1, round(rng.uniform(*seconds) * sample_rate / 1152))):
+                acc += remainder
+                padding = acc >= sample_rate
+                acc -= sample_rate if padding else 0
+                out += _mp3_frame(bitrate, sample_rate, int(padding))
+            if rng.random() < 0.2:
+                out += b"TAG" + bytes(125)
+            name = f"{vid}.mp3" if naming == "global" else f"{sura:03}{ayah:03}.mp3"
+            with open(os.path.join(audio_dir, name), 'wb') as f:
+                f.write(out)
+            count += 1
+    return count
+
+
+def parse_surahs(spec):
+    """'1,2,110-114' -> sorted surah numbers"""
+    surahs = set()
+    for part in spec.split(','):
+        first, _, last = part.partition('-')
+        surahs.update(range(int(first), int(last or first) + 1))
+    return sorted(surahs)
+
+
+def load_verse_index(quran_db):
+    with SourceCatalog({"quran": quran_db}) as catalog:
+        counts = catalog.surah_counts("quran")
+    return VerseIndex([counts[sura] for sura in sorted(counts)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-surah audio packs with a seek index")
+    verses = argparse.ArgumentParser(add_help=False)
+    verses.add_argument("--quran-db", help="quran.db for the verse counts "
+                                           "(default: quran.db in the pipeline's database directory)")
+    verses.add_argument("--surahs", type=parse_surahs, help="surahs to process, e.g. 1,2,110-114 (default: all)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", parents=[verses], help="build the packs of a reciter")
+    build.add_argument("reciter", choices=RECITERS)
+    build.add_argument("audio_dir")
+    build.add_argument("out_dir")
+    fixture = commands.add_parser("fixture", parents=[verses], help="write silent per-ayah test MP3s")
+    fixture.add_argument("audio_dir")
+    fixture.add_argument("--naming", choices=("global", "sura-ayah"), default="global")
+    fixture.add_argument("--seed", type=int, default=0)
+    locate = commands.add_parser("locate", help="byte range and time of one ayah in a pack")
+    locate.add_argument("pack_dir")
+    locate.add_argument("ref", metavar="SURA:AYAH")
+    args = parser.parse_args()
+
+    if args.command == "locate":
+        sura, ayah = (int(x) for x in args.ref.split(':'))
+        path, offset, length, start_ms, duration_ms = AudioPackIndex(args.pack_dir).locate(sura, ayah)
+        print(f"{path} bytes {offset}-{offset + length - 1}, {start_ms / 1000:.3f}s +{duration_ms / 1000:.3f}s")
+        return
+
+    quran_db = args.quran_db
+    if quran_db is None:
+        import process_data_v5
+        quran_db = f"{process_data_v5.ALQURAN_DB_DIR}/quran.db"
+    index = load_verse_index(quran_db)
+    if args.command == "fixture":
+        count = write_test_audio(args.audio_dir, index, args.surahs, args.naming, args.seed)
+        print(f"{count} ayah files written to {args.audio_dir}")
+        return
+    built, reused, skipped = build_packs(args.reciter, args.audio_dir, args.out_dir, index, args.surahs)
+    print(f"{args.reciter}: {len(built)} surah packs built, {len(reused)} unchanged")
+    if skipped:
+        listed = ', '.join(map(str, skipped[:10])) + (", ..." if len(skipped) > 10 else "")
+        print(f"  {len(skipped)} surahs skipped for missing ayah files: {listed}")
+
+
+if __name__ == "__main__":
+    main()
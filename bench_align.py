@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Letter-by-letter alignment benchmark over every word of corpus.db / words.db.
+
+Times arabic_text.word_letters() against a port of the grouping the app used
+to do on every render (diacritic groups and Latin digraphs paired by
+position), counts the words aligned through their marks and the ones that
+fall back to positional pairing, and how many words the two disagree on.
+
+Usage: python bench_align.py [repeats]
+"""
+import json
+import re
+import sys
+import time
+
+import process_data_v5
+from arabic_text import align_letters, letter_groups, mark_anchors, translit_segments, word_letters
+
+# renderLetterByLetter in App.tsx before the alignment moved to the build
+JS_DIACRITICS = re.compile("[\u064B-\u0652\u0670\u0640\u0671]")
+JS_UNITS = re.compile("th|kh|sh|gh|dh|zh|.", re.S | re.I)
+
+
+def naive_letters(arabic, translit):
+    """[(Arabic group, Latin group)] paired by position, as the app did"""
+    groups = []
+    for ch in arabic or "":
+        if groups and JS_DIACRITICS.match(ch):
+            groups[-1] += ch
+        else:
+            groups.append(ch)
+    units = JS_UNITS.findall(JS_DIACRITICS.sub("", translit or "")[::-1])
+    count = max(len(groups), len(units))
+    return [(groups[i] if i < len(groups) else "", units[i] if i < len(units) else "") for i in range(count)]
+
+
+def load_raw_words():
+    """(arabic, raw words.db transliteration) of every word, in verse order"""
+    conn = process_data_v5.source_catalog().attach("corpus", "words", "w")
+    return [(arabic, translit) for _, _, _, arabic, translit in conn.execute(process_data_v5.WORDS_JOIN_SQL)]
+
+
+def timed(fn, words, repeats):
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for arabic, translit in words:
+            fn(arabic, translit)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def bench(repeats=3):
+    try:
+        words = load_raw_words()
+    finally:
+        process_data_v5.close_source_catalog()
+    distinct = set(words)
+    print(f"{len(words)} words, {len(distinct)} distinct (arabic, translit) pairs")
+
+    by_marks = sum(mark_anchors(letter_groups(a), translit_segments(t)) is not None for a, t in distinct)
+    changed = 0
+    letters_bytes = 0
+    for arabic, translit in words:
+        if align_letters(arabic, translit) != naive_letters(arabic, translit):
+            changed += 1
+        _, letters = word_letters(arabic, translit)
+        letters_bytes += len(json.dumps(letters, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+    print(f"aligned by marks  {by_marks} of {len(distinct)} distinct, {len(distinct) - by_marks} positional")
+    print(f"differs from app  {changed} of {len(words)} words")
+    print(f"letters JSON      {letters_bytes / 1024:.0f} KB")
+
+    print(f"{'aligner':<20}{'total ms':>10}{'us/word':>10}")
+    for label, fn, sample in (("app (positional)", naive_letters, words),
+                              ("word_letters", word_letters, words),
+                              ("word_letters once", word_letters, list(distinct))):
+        elapsed = timed(fn, sample, repeats)
+        print(f"{label:<20}{elapsed * 1000:>10.1f}{elapsed * 1e6 / len(words):>10.2f}")
+
+
+if __name__ == "__main__":
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 3)
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Delta package size check for a one-line source change.
+
+Builds the synthetic x1 sources (bench_fixtures, cached under --workdir),
+appends one Ihya line to a copy of the JSONL, builds again into a fresh
+directory against the first build (as --delta does) and writes the delta
+package between the two. The package is applied to a copy of the first
+build, which verifies every file it writes. Exits 1 if the package is
+larger than --max-kb: a one-line change should ship kilobytes, not the
+search index and the tafsir store again.
+
+Usage: python bench_delta.py [--workdir DIR] [--max-kb 256]
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+import bench_fixtures
+import process_data_v5 as p
+from delta_package import apply_delta, make_delta
+
+MAX_PACKAGE_KB = 256
+
+
+def changed_jsonl(path, out_path):
+    """Copy of the Ihya JSONL with one more commentary line for a verse that has some"""
+    with open(path, 'r', encoding='utf-8') as f:
+        lines = f.read().splitlines()
+    for line in lines:
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            continue
+        if p.parse_ihya_entry(entry):
+            break
+    entry['analysis']['english_text'] = ("One added line of commentary on patience in hardship, "
+                                         "to check what a small source change ships. "
+                                         + entry['analysis']['english_text'][:300])
+    with open(out_path, 'w', encoding='utf-8') as f:
+        f.write("\n".join(lines) + "\n" + json.dumps(entry, ensure_ascii=False) + "\n")
+    return entry['custom_id']
+
+
+def build(db_dir, ihya_jsonl, out_dir, previous_dir=None):
+    p.configure_paths(out_dir, db_dir, ihya_jsonl, os.path.join(db_dir, "kathir.db"),
+                      os.path.join(db_dir, "quranindex.db"))
+    p.process_data(force=True, previous_dir=previous_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the delta package of a one-line Ihya change")
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "ihya_bench"),
+                        help="where fixtures are kept between runs")
+    parser.add_argument("--max-kb", type=int, default=MAX_PACKAGE_KB,
+                        help=f"largest acceptable package in KB (default: {MAX_PACKAGE_KB})")
+    args = parser.parse_args()
+
+    db_dir = os.path.join(args.workdir, "fixtures_x1")
+    marker = os.path.join(db_dir, "summary.json")
+    if not os.path.exists(marker):
+        print(f"Generating x1 fixtures in {db_dir}...")
+        summary = bench_fixtures.generate_fixtures(db_dir, 1)
+        with open(marker, 'w') as f:
+            json.dump(summary, f)
+
+    work = tempfile.mkdtemp(prefix="delta_check_", dir=args.workdir)
+    try:
+        old_dir, new_dir = os.path.join(work, "old"), os.path.join(work, "new")
+        build(db_dir, os.path.join(db_dir, "ihya.jsonl"), old_dir)
+        ref = changed_jsonl(os.path.join(db_dir, "ihya.jsonl"), os.path.join(work, "ihya.jsonl"))
+        build(db_dir, os.path.join(work, "ihya.jsonl"), new_dir, previous_dir=old_dir)
+
+        package = os.path.join(work, "delta.zip")
+        delta = make_delta(old_dir, new_dir, package)
+        print(f"\nOne Ihya line added for {ref}:")
+        for entry in delta['files']:
+            print(f"  {entry['action']:7} {entry.get('blob_bytes', 0):>10}  {entry['name']}")
+        size_kb = os.path.getsize(package) / 1024
+        print(f"  package {size_kb:.1f} KB (limit {args.max_kb} KB)")
+        apply_delta(old_dir, package, os.path.join(work, "applied"))
+        print("  applied and verified")
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+    if size_kb > args.max_kb:
+        print("FAILED: the package is larger than the limit")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
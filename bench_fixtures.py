@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Synthetic source databases for benchmarking the data pipeline.
+
+Generates quran.db (FTS3 verses), en_sahih.db (FTS4 verses), corpus.db
+(corpus), words.db (allwords), kathir.db (tafsir_kathir), quranindex.db
+(quranindex) and an Ihya analysis JSONL with the same schemas as the real sources, at a scale factor
+of the 6,236-verse corpus: every surah gets scale x its real verse count.
+
+Usage: python bench_fixtures.py OUT_DIR [scale] [ihya_lines]
+"""
+import itertools
+import json
+import os
+import random
+import sqlite3
+import sys
+
+from process_data import SURAHS
+from process_data_v5 import BOOK_TITLES
+
+WORDS_PER_VERSE = (3, 22)        # ~12.4 words per verse like the real corpus
+IHYA_LINES_PER_SCALE = 20000
+KATHIR_ROWS_PER_SCALE = 590
+TOPICS_PER_SCALE = 1858
+IHYA_REPEAT_RUN = 0.15           # share of lines re-analysing an earlier entry of the same verse
+IHYA_SHARED_PASSAGE = 0.05       # share of lines quoting an earlier passage for another verse
+
+LETTERS = "ابتثجحخدذرزسشصضطظعغفقكلمنهوي"
+HARAKAT = "َُِْ"      # fatha, kasra, damma, sukun
+SHADDA = "ّ"
+TRANSLIT = dict(zip(LETTERS, [
+    "a", "b", "t", "th", "j", "ḥ", "kh", "d", "dh", "r", "z", "s", "sh", "ṣ",
+    "ḍ", "ṭ", "ẓ", "ʿ", "gh", "f", "q", "k", "l", "m", "n", "h", "w", "y",
+]))
+# (arabic, transliteration) of common prefix / suffix segments
+PREFIXES = [("ٱلْ", "ٱlْ"), ("وَ", "wَ"), ("بِ", "bِ"), ("فَ", "fَ")]
+SUFFIX = ("هُمْ", "hُmْ")
+ENGLISH = ("the and of to in is who those allah lord mercy day people believe "
+           "heart patience gratitude knowledge prayer soul world hereafter "
+           "truth guidance light fear hope love repentance remembrance").split()
+
+SCHEMAS = {
+    "quran.db": [
+        "CREATE TABLE properties( property text, value text )",
+        "CREATE VIRTUAL TABLE verses using fts3( sura integer, ayah integer, text text, primary key(sura, ayah ) )",
+    ],
+    "en_sahih.db": [
+        "CREATE VIRTUAL TABLE verses USING fts4(sura int, ayah int, text text, footnote text)",
+    ],
+    "corpus.db": [
+        "CREATE TABLE corpus (surah INTEGER, ayah INTEGER, word INTEGER, "
+        "ar1 TEXT, ar2 TEXT, ar3 TEXT, ar4 TEXT, ar5 TEXT)",
+    ],
+    "words.db": [
+        "CREATE TABLE allwords (sura INTEGER, ayah INTEGER, word INTEGER, en TEXT)",
+    ],
+    "kathir.db": [
+        "CREATE TABLE tafsir_kathir (surah INTEGER, ayah INTEGER, tafsir_text TEXT)",
+        "CREATE INDEX idx_tafsir_kathir_sura_aya ON tafsir_kathir (surah, ayah)",
+        "CREATE TABLE android_metadata (locale TEXT)",
+    ],
+    "quranindex.db": [
+        'CREATE TABLE "quranindex" ("en" TEXT NOT NULL, "Verses" TEXT, "tags" TEXT, "fr" TEXT, "ar" TEXT)',
+    ],
+}
+
+
+def verse_counts(scale=1):
+    return [s['verses'] * scale for s in SURAHS]
+
+
+def _make_vocabulary(rng, size=12000):
+    """(segments, translit) of synthetic vocalized words"""
+    vocabulary = []
+    for _ in range(size):
+        stem = ""
+        translit = ""
+        for _ in range(rng.randint(2, 5)):
+            letter = rng.choice(LETTERS)
+            mark = rng.choice(HARAKAT)
+            if rng.random() < 0.1:
+                mark = SHADDA + mark
+            stem += letter + mark
+            translit += TRANSLIT[letter] + mark
+        segments = [stem]
+        if rng.random() < 0.35:
+            prefix, prefix_translit = rng.choice(PREFIXES)
+            segments.insert(0, prefix)
+            translit = prefix_translit + translit
+        if rng.random() < 0.2:
+            segments.append(SUFFIX[0])
+            translit += SUFFIX[1]
+        # words.db stores the transliteration RTL-reversed
+        vocabulary.append((segments, translit[::-1]))
+    return vocabulary
+
+
+def _connect(out_dir, name):
+    path = os.path.join(out_dir, name)
+    if os.path.exists(path):
+        os.remove(path)
+    conn = sqlite3.connect(path)
+    for statement in SCHEMAS[name]:
+        conn.execute(statement)
+    return conn
+
+
+def generate_fixtures(out_dir, scale=1, ihya_lines=None, seed=0):
+    """Write every synthetic source into out_dir; returns a summary dict"""
+    os.makedirs(out_dir, exist_ok=True)
+    rng = random.Random(seed)
+    vocabulary = _make_vocabulary(rng)
+    weights = list(itertools.accumulate(1.0 / rank for rank in range(1, len(vocabulary) + 1)))  # Zipf-like
+    counts = verse_counts(scale)
+
+    quran = _connect(out_dir, "quran.db")
+    quran.executemany("INSERT INTO properties VALUES (?, ?)", [("schema_version", "2"), ("text_version", "2")])
+    sahih = _connect(out_dir, "en_sahih.db")
+    corpus = _connect(out_dir, "corpus.db")
+    words = _connect(out_dir, "words.db")
+    total_words = 0
+    for sura, count in enumerate(counts, 1):
+        verse_rows, translation_rows, corpus_rows, word_rows = [], [], [], []
+        for ayah in range(1, count + 1):
+            chosen = rng.choices(vocabulary, cum_weights=weights, k=rng.randint(*WORDS_PER_VERSE))
+            verse_rows.append((sura, ayah, " ".join("".join(seg) for seg, _ in chosen) + " "))
+            translation_rows.append((sura, ayah, " ".join(rng.choices(ENGLISH, k=rng.randint(8, 40))).capitalize() + ".", None))
+            for word, (segments, translit) in enumerate(chosen, 1):
+                corpus_rows.append((sura, ayah, word, *segments, *[None] * (5 - len(segments))))
+                word_rows.append((sura, ayah, word, translit))
+        total_words += len(corpus_rows)
+        quran.executemany("INSERT INTO verses (sura, ayah, text) VALUES (?, ?, ?)", verse_rows)
+        sahih.executemany("INSERT INTO verses (sura, ayah, text, footnote) VALUES (?, ?, ?, ?)", translation_rows)
+        corpus.executemany("INSERT INTO corpus VALUES (?, ?, ?, ?, ?, ?, ?, ?)", corpus_rows)
+        words.executemany("INSERT INTO allwords VALUES (?, ?, ?, ?)", word_rows)
+    for conn in (quran, sahih, corpus, words):
+        conn.commit()
+        conn.close()
+
+    kathir = _connect(out_dir, "kathir.db")
+    kathir.execute("INSERT INTO android_metadata VALUES ('en_US')")
+    refs = set()
+    while len(refs) < KATHIR_ROWS_PER_SCALE * scale:
+        sura = rng.randint(1, len(counts))
+        refs.add((sura, rng.randint(1, counts[sura - 1])))
+    for sura, ayah in sorted(refs, key=lambda r: rng.random()):
+        paragraphs = ["".join("".join(seg) + " " for seg, _ in rng.choices(vocabulary, cum_weights=weights, k=rng.randint(15, 60)))
+                      for _ in range(rng.randint(1, 6))]
+        text = ('\n        <div dir="rtl" style="text-align: right; font-family: \'Amiri\', serif;">\n'
+                '        <b>تفسير إحياء علوم الدين</b><br/>\n        '
+                + "<br/><br/>\n        ".join(paragraphs) + "\n        </div>")
+        kathir.execute("INSERT INTO tafsir_kathir VALUES (?, ?, ?)", (sura, ayah, text))
+    kathir.commit()
+    kathir.close()
+
+    topics = _connect(out_dir, "quranindex.db")
+    for i in range(TOPICS_PER_SCALE * scale):
+        verses = []
+        for _ in range(rng.randint(1, 30)):
+            sura = rng.randint(1, len(counts))
+            verses.append(f"{sura}:{rng.randint(1, counts[sura - 1])}")
+        name = " ".join(rng.choices(ENGLISH, k=rng.randint(1, 3))).title() + f" {i}"
+        tags = ", ".join(rng.choices(ENGLISH, k=2)) if rng.random() < 0.17 else None
+        topics.execute("INSERT INTO quranindex VALUES (?, ?, ?, '', NULL)", (name, ", ".join(verses), tags))
+    topics.commit()
+    topics.close()
+
+    if ihya_lines is None:
+        ihya_lines = IHYA_LINES_PER_SCALE * scale
+    books = [key + "_en.txt" for key in BOOK_TITLES]
+    recent = []
+    with open(os.path.join(out_dir, "ihya.jsonl"), 'w', encoding='utf-8') as f:
+        for i in range(ihya_lines):
+            roll = rng.random()
+            if roll < 0.005:
+                f.write("{not json\n")
+                continue
+            sura = rng.randint(1, len(counts))
+            ref = f"{sura}:{rng.randint(1, counts[sura - 1])}" if roll > 0.02 else f"intro-{i}"
+            dup = rng.random()
+            if recent and dup < IHYA_REPEAT_RUN + IHYA_SHARED_PASSAGE:
+                earlier = rng.choice(recent)
+                entry = json.loads(json.dumps(earlier))
+                if dup < IHYA_REPEAT_RUN:
+                    # A repeated run: same verse, a few words of the analysis differ
+                    words = entry["analysis"]["english_text"].split()
+                    for _ in range(max(1, len(words) // 40)):
+                        words[rng.randrange(len(words))] = rng.choice(ENGLISH)
+                    entry["analysis"]["english_text"] = " ".join(words)
+                else:
+                    entry["custom_id"] = ref
+            else:
+                entry = {
+                    "custom_id": ref,
+                    "file": rng.choice(books),
+                    "analysis": {
+                        "analysis_type": "tafsir",
+                        "english_text": " ".join(rng.choices(ENGLISH, k=rng.randint(30, 200))),
+                        "arabic_snippet": " ".join("".join(seg) for seg, _ in rng.choices(vocabulary, cum_weights=weights, k=60)),
+                    },
+                }
+                recent = (recent + [entry])[-1000:]
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    return {"scale": scale, "verses": sum(counts), "words": total_words,
+            "ihya_lines": ihya_lines, "kathir_rows": KATHIR_ROWS_PER_SCALE * scale,
+            "topics": TOPICS_PER_SCALE * scale}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__.strip())
+        sys.exit(1)
+    summary = generate_fixtures(sys.argv[1],
+                                int(sys.argv[2]) if len(sys.argv) > 2 else 1,
+                                int(sys.argv[3]) if len(sys.argv) > 3 else None)
+    print(json.dumps(summary))
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Scaling benchmark for the v5 data pipeline.
+
+For every scale factor, synthetic sources are generated with bench_fixtures
+(and cached under --workdir), then each stage runs in a fresh process so its
+wall time and peak RSS are measured in isolation. A full build is timed the
+same way.
+
+Usage: python bench_pipeline.py [--scales 1 10 100] [--workdir DIR]
+                                [--output results.json] [--baseline old.json]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import queue as queue_module
+import resource
+import sys
+import tempfile
+import time
+
+import bench_fixtures
+
+STAGES = ["surahs", "text", "translation", "words", "ihya", "search_index", "arabic_index", "kathir",
+          "topics", "tajweed", "navigation", "full_build"]
+REGRESSION_THRESHOLD = 1.2
+POLL_SECONDS = 1.0
+
+
+def _peak_rss_kb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak  # bytes on macOS
+
+
+def _run_stage(stage, db_dir, out_dir, queue):
+    import process_data_v5 as p
+    from verse_index import VerseIndex
+
+    p.configure_paths(out_dir, db_dir, os.path.join(db_dir, "ihya.jsonl"), os.path.join(db_dir, "kathir.db"),
+                      os.path.join(db_dir, "quranindex.db"))
+    os.makedirs(out_dir, exist_ok=True)
+    rss_before = _peak_rss_kb()
+    start = time.perf_counter()
+    if stage == "full_build":
+        p.process_data(force=True)
+        rows = None
+    else:
+        surahs = p.get_surahs()
+        index = VerseIndex.from_surahs(surahs)
+        if stage == "surahs":
+            rows = len(index)
+        elif stage in ("text", "translation"):
+            p.STAGE_LOADERS[stage](index)
+            rows = len(index)
+        elif stage == "words":
+            rows = len(p.load_words(index))
+        elif stage == "ihya":
+            rows = sum(len(entries) for entries in
+                       p.load_ihya_tafsir(passages=p.ihya_dedup.PassageIndex()).values())
+        elif stage == "search_index":
+            rows = p.search_index.build_search_index(
+                os.path.join(out_dir, "search.db"), index, p.load_translations(index),
+                p.load_words(index), p.iter_ihya_entries(index, p.load_ihya_tafsir()))
+        elif stage == "kathir":
+            rows = p.kathir_export.export_kathir(out_dir, index, p.iter_kathir_rows())[0]
+        elif stage == "topics":
+            rows = p.topic_index.build_topic_index(os.path.join(out_dir, "topics.json"),
+                                                   os.path.join(out_dir, "topic_index.bin"),
+                                                   index, p.iter_topic_rows())[1]
+        elif stage == "tajweed":
+            rows = p.tajweed.write_tajweed(os.path.join(out_dir, "tajweed.json"), p.load_verses_text(index),
+                                           p.load_words(index))[0]
+        elif stage == "navigation":
+            rows = p.navigation.write_navigation(os.path.join(out_dir, p.navigation.NAVIGATION_NAME), index)
+        elif stage == "arabic_index":
+            rows = sum(p.arabic_index.build_arabic_index(
+                os.path.join(out_dir, "arabic_index.db"), index, p.iter_corpus_rows()))
+        p.close_source_catalog()
+    seconds = time.perf_counter() - start
+    queue.put({"seconds": seconds, "rows": rows, "peak_rss_kb": _peak_rss_kb(),
+               "baseline_rss_kb": rss_before})
+
+
+def measure(stage, db_dir, out_dir):
+    """
+    Run one stage in a fresh interpreter; returns its timing dict, or
+    {"failed": reason} if the child died before reporting (its traceback is
+    on stderr).
+    """
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_run_stage, args=(stage, db_dir, out_dir, queue))
+    proc.start()
+    while True:
+        try:
+            result = queue.get(timeout=POLL_SECONDS)
+            break
+        except queue_module.Empty:
+            if not proc.is_alive():
+                # The child may have put its result just before exiting
+                try:
+                    result = queue.get(timeout=POLL_SECONDS)
+                    break
+                except queue_module.Empty:
+                    result = {"failed": f"exit code {proc.exitcode}"}
+                    break
+    proc.join()
+    return result
+
+
+def bench(scales, workdir):
+    results = {"scales": {}}
+    for scale in scales:
+        db_dir = os.path.join(workdir, f"fixtures_x{scale}")
+        marker = os.path.join(db_dir, "summary.json")
+        if os.path.exists(marker):
+            with open(marker) as f:
+                summary = json.load(f)
+        else:
+            print(f"Generating x{scale} fixtures in {db_dir}...")
+            summary = bench_fixtures.generate_fixtures(db_dir, scale)
+            with open(marker, 'w') as f:
+                json.dump(summary, f)
+        out_dir = os.path.join(workdir, f"out_x{scale}")
+        print(f"\nScale x{scale}: {summary['verses']} verses, {summary['words']} words, "
+              f"{summary['ihya_lines']} Ihya lines")
+        print(f"  {'stage':<14}{'seconds':>10}{'rows':>10}{'rows/s':>12}{'peak RSS MB':>13}")
+        stages = {}
+        for stage in STAGES:
+            r = stages[stage] = measure(stage, db_dir, out_dir)
+            if "failed" in r:
+                print(f"  {stage:<14}FAILED ({r['failed']})")
+                continue
+            rate = f"{r['rows'] / r['seconds']:,.0f}" if r['rows'] and r['seconds'] else "-"
+            print(f"  {stage:<14}{r['seconds']:>10.2f}{r['rows'] if r['rows'] is not None else '-':>10}"
+                  f"{rate:>12}{r['peak_rss_kb'] / 1024:>13.1f}")
+        results["scales"][str(scale)] = {"fixtures": summary, "stages": stages}
+    return results
+
+
+def compare(results, baseline):
+    """Stages at least REGRESSION_THRESHOLD x slower or larger than the baseline"""
+    regressions = []
+    for scale, data in results["scales"].items():
+        old = baseline.get("scales", {}).get(scale)
+        if not old:
+            continue
+        for stage, r in data["stages"].items():
+            before = old["stages"].get(stage)
+            if not before or "failed" in before or "failed" in r:
+                continue
+            for metric in ("seconds", "peak_rss_kb"):
+                if before[metric] and r[metric] / before[metric] >= REGRESSION_THRESHOLD:
+                    regressions.append((scale, stage, metric, before[metric], r[metric]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the v5 pipeline on synthetic sources")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10],
+                        help="scale factors of the real corpus (default: 1 10)")
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "ihya_bench"),
+                        help="where fixtures and outputs are kept between runs")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--baseline", help="earlier --output to compare against")
+    args = parser.parse_args()
+
+    results = bench(args.scales, args.workdir)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=1)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f))
+        for scale, stage, metric, before, after in regressions:
+            print(f"REGRESSION x{scale} {stage} {metric}: {before:.2f} -> {after:.2f}")
+        if regressions:
+            sys.exit(1)
+    if any("failed" in r for data in results["scales"].values() for r in data["stages"].values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Query latency benchmark for search.db.
+
+Usage: python bench_search.py [path/to/search.db] [repeats]
+"""
+import statistics
+import sys
+import time
+
+import process_data_v5
+from search_index import SearchIndex
+
+# (query, search() keyword arguments)
+QUERIES = [
+    ("merciful", {}),
+    ("patience", {}),
+    ("patience gratitude", {}),
+    ("the", {}),
+    ("heart", {"column": "ihya"}),
+    ("mercy", {"column": "translation"}),
+    ("bsm", {"column": "translit"}),
+    ("rahman", {}),
+    ("pati", {"prefix": True}),
+    ("m", {"prefix": True}),
+    ("day of judgement", {}),
+    ("zzzz", {}),
+]
+
+
+def bench(path, repeats=50):
+    with SearchIndex(path) as index:
+        print(f"{'query':<24}{'hits':>6}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+        for query, kwargs in QUERIES:
+            timings = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                hits = index.search(query, **kwargs)
+                timings.append((time.perf_counter() - start) * 1000)
+            timings.sort()
+            label = query + ("*" if kwargs.get("prefix") else "") + (f" [{kwargs['column']}]" if "column" in kwargs else "")
+            print(f"{label:<24}{len(hits):>6}{statistics.median(timings):>10.2f}"
+                  f"{timings[int(len(timings) * 0.95) - 1]:>10.2f}{timings[-1]:>10.2f}")
+
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else f"{process_data_v5.BASE_DIR}/search.db"
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    bench(path, repeats)
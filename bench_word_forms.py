@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Size and parse-time benchmark of the interned word forms.
+
+Compares verses_v4.json with inline word records (as written before
+word_forms) against the form-id verses plus word_forms.json: bytes on disk
+and gzipped, parse time and memory of the parsed data, in Python and, when
+node is on the PATH, in JavaScript as the app parses it.
+
+Usage: python bench_word_forms.py [build_dir] [repeats]
+"""
+import gzip
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import process_data_v5
+import word_forms
+
+NODE_SCRIPT = """
+const fs = require('fs');
+const files = process.argv.slice(1);  // node -e puts the arguments right after the binary
+const texts = files.map((f) => fs.readFileSync(f, 'utf8'));
+global.gc();
+const before = process.memoryUsage().heapUsed;
+const start = process.hrtime.bigint();
+const parsed = texts.map((t) => JSON.parse(t));
+const ms = Number(process.hrtime.bigint() - start) / 1e6;
+global.gc();
+console.log(JSON.stringify({ms, heap: process.memoryUsage().heapUsed - before, n: parsed.length}));
+"""
+
+
+def _parse(texts):
+    return [json.loads(text) for text in texts]
+
+
+def python_parse(texts, repeats):
+    """(best seconds, bytes held by the parsed objects)"""
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        _parse(texts)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    parsed = _parse(texts)
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del parsed
+    return best, held
+
+
+def node_parse(paths, repeats):
+    """(best ms, heap bytes) of JSON.parse in node, or None without node"""
+    node = shutil.which("node")
+    if not node:
+        return None
+    runs = [json.loads(subprocess.run([node, "--expose-gc", "-e", NODE_SCRIPT, *paths],
+                                      capture_output=True, text=True, check=True).stdout)
+            for _ in range(repeats)]
+    return min(r["ms"] for r in runs), min(r["heap"] for r in runs)
+
+
+def bench(build_dir, repeats=3):
+    with open(os.path.join(build_dir, "verses_v4.json"), 'r') as f:
+        verses = json.load(f)
+    forms = word_forms.load_forms(os.path.join(build_dir, word_forms.FORMS_NAME))
+    inline = word_forms.decode_verses(forms, verses)
+    word_count = sum(len(v['words']) for s in verses.values() for v in s)
+    print(f"{word_count} words, {len(forms)} forms")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Both layouts as process_data_v5 writes them
+        paths = {"inline": [os.path.join(tmp, "inline.json")],
+                 "interned": [os.path.join(build_dir, "verses_v4.json"),
+                              os.path.join(build_dir, word_forms.FORMS_NAME)]}
+        with open(paths["inline"][0], 'w') as f:
+            json.dump(inline, f)
+        print(f"{'layout':<10}{'MB':>8}{'gzip MB':>9}{'py ms':>8}{'py heap MB':>12}{'js ms':>8}{'js heap MB':>12}")
+        for layout, files in paths.items():
+            data = [open(path, 'rb').read() for path in files]
+            size = sum(len(d) for d in data)
+            packed = sum(len(gzip.compress(d, 6)) for d in data)
+            seconds, held = python_parse([d.decode('utf-8') for d in data], repeats)
+            node = node_parse(files, repeats)
+            js = f"{node[0]:>8.0f}{node[1] / 2**20:>12.1f}" if node else f"{'-':>8}{'-':>12}"
+            print(f"{layout:<10}{size / 2**20:>8.2f}{packed / 2**20:>9.2f}{seconds * 1000:>8.0f}{held / 2**20:>12.1f}{js}")
+
+
+if __name__ == "__main__":
+    build_dir = sys.argv[1] if len(sys.argv) > 1 else process_data_v5.BASE_DIR
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    bench(build_dir, repeats)
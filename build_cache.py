@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Build manifest for incremental data builds.
+
+Records content hashes of the source databases / JSONL, per-surah digests
+of every extracted stage and hashes of the written outputs, so a rebuild
+can skip unchanged stages and only touch the surahs that actually changed.
+"""
+import hashlib
+import json
+import os
+
+MANIFEST_NAME = ".build_manifest.json"
+# Bumped whenever what an output holds changes, so older trees are rebuilt in full
+MANIFEST_VERSION = 7
+CHUNK_SIZE = 1 << 20
+
+
+def file_digest(path):
+    """SHA-256 of a file, or None if it does not exist"""
+    if not os.path.exists(path):
+        return None
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def value_digest(value):
+    """Stable digest of any JSON-serialisable value"""
+    data = json.dumps(value, sort_keys=True, ensure_ascii=False).encode('utf-8')
+    return hashlib.sha1(data).hexdigest()
+
+
+def load_manifest(base_dir):
+    """Load the previous build manifest, or an empty one"""
+    path = os.path.join(base_dir, MANIFEST_NAME)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if manifest.get('version') != MANIFEST_VERSION:
+        return {}
+    return manifest
+
+
+def save_manifest(base_dir, manifest):
+    manifest['version'] = MANIFEST_VERSION
+    path = os.path.join(base_dir, MANIFEST_NAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def outputs_intact(base_dir, manifest):
+    """True if every output recorded in the manifest is still on disk unmodified"""
+    outputs = manifest.get('outputs')
+    if not outputs:
+        return False
+    for name, digest in outputs.items():
+        if file_digest(os.path.join(base_dir, name)) != digest:
+            return False
+    return True
+
+
+def stale_stages(stage_sources, sources, manifest):
+    """Stages with at least one source whose hash differs from the last build"""
+    previous = manifest.get('sources', {})
+    return [
+        stage for stage, names in stage_sources.items()
+        if any(sources[name] != previous.get(name) for name in names)
+    ]
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Per-stage instrumentation for the data build.
+
+Every stage of a build runs inside BuildReport.stage(), which records its
+wall time, the rows it produced, the bytes of the files it read and wrote
+and, when memory tracing is on, the tracemalloc peak reached while it ran.
+The report is written as JSON so build cost can be compared across data
+releases. Tracing slows pure-Python stages several times over, and not
+evenly, so it is opt-in and the report says whether it was on: compare
+seconds only between reports taken without it. With a profile directory every stage is also run under cProfile
+and its stats dumped to <dir>/<stage>.prof (view with `python -m pstats`).
+Only one profiler can be active at a time (Python 3.12+ raises otherwise),
+so profiled builds run their stages one at a time.
+
+tracemalloc only sees the build process itself; memory used by worker
+processes (--ihya-jobs > 1) is not included. With --jobs > 1 stages
+overlap, so a stage's peak also counts what the stages running beside it
+held at the time.
+"""
+import cProfile
+import json
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+REPORT_VERSION = 2
+
+
+class StageRecord:
+    """Measurements of one stage run"""
+
+    def __init__(self, name):
+        self.name = name
+        self.rows = None
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.seconds = 0.0
+        self.peak_bytes = None
+
+    def read(self, *paths):
+        """Count the size of input files the stage consumed"""
+        for path in paths:
+            if path and os.path.isfile(path):
+                self.bytes_read += os.path.getsize(path)
+
+    def wrote(self, *paths):
+        """Count the size of output files the stage produced"""
+        for path in paths:
+            if path and os.path.isfile(path):
+                self.bytes_written += os.path.getsize(path)
+
+    def as_dict(self):
+        rate = self.rows / self.seconds if self.rows and self.seconds else None
+        return {
+            "stage": self.name,
+            "seconds": round(self.seconds, 4),
+            "rows": self.rows,
+            "rows_per_sec": round(rate, 1) if rate else None,
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+            "tracemalloc_peak": self.peak_bytes,
+        }
+
+
+class BuildReport:
+    """Collects a StageRecord for every stage of one build"""
+
+    def __init__(self, trace_memory=False, profile_dir=None):
+        self.trace_memory = trace_memory
+        self.profile_dir = profile_dir
+        self.stages = []
+        self.info = {}
+        self._started = time.perf_counter()
+        self._owns_tracing = trace_memory and not tracemalloc.is_tracing()
+        if self._owns_tracing:
+            tracemalloc.start()
+        if profile_dir:
+            os.makedirs(profile_dir, exist_ok=True)
+
+    @contextmanager
+    def stage(self, name):
+        record = StageRecord(name)
+        profiler = cProfile.Profile() if self.profile_dir else None
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        if profiler:
+            profiler.enable()
+        try:
+            yield record
+        finally:
+            if profiler:
+                profiler.disable()
+            record.seconds = time.perf_counter() - start
+            if self.trace_memory:
+                record.peak_bytes = tracemalloc.get_traced_memory()[1]
+            if profiler:
+                profiler.dump_stats(os.path.join(self.profile_dir, f"{name}.prof"))
+            self.stages.append(record)
+
+    def as_dict(self):
+        return {
+            "version": REPORT_VERSION,
+            "total_seconds": round(time.perf_counter() - self._started, 4),
+            "trace_memory": self.trace_memory,
+            **self.info,
+            "stages": [record.as_dict() for record in self.stages],
+        }
+
+    def summary(self):
+        """Human readable table of the recorded stages"""
+        lines = [f"  {'stage':<14}{'seconds':>9}{'rows':>9}{'rows/s':>11}{'read KB':>10}{'written KB':>12}{'peak MB':>9}"]
+        for r in map(StageRecord.as_dict, self.stages):
+            lines.append(
+                f"  {r['stage']:<14}{r['seconds']:>9.2f}"
+                f"{r['rows'] if r['rows'] is not None else '-':>9}"
+                f"{format(r['rows_per_sec'], ',.0f') if r['rows_per_sec'] else '-':>11}"
+                f"{r['bytes_read'] // 1024:>10}{r['bytes_written'] // 1024:>12}"
+                f"{format(r['tracemalloc_peak'] / 2**20, '.1f') if r['tracemalloc_peak'] is not None else '-':>9}")
+        return "\n".join(lines)
+
+    def write(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.as_dict(), f, indent=1)
+
+    def close(self):
+        if self._owns_tracing:
+            tracemalloc.stop()
+            self._owns_tracing = False
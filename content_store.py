@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Content-addressed copies of a build's outputs, for immutable caching.
+
+Every output listed in the build manifest is copied to the publish
+directory under a name carrying the start of its SHA-256, keeping its
+directory and extension (verses/surah_2.json -> verses/surah_2.1f0c3a9e7d2b.json).
+assets.json, the one file with a fixed name, maps each logical name to its
+published file, hash and size, and carries a build id derived from all of
+them: two builds with the same id are the same data.
+
+A published file never changes, so it can be cached forever; only
+assets.json needs revalidating. Files of earlier builds are left in place
+for clients that still hold an older assets.json.
+"""
+import hashlib
+import json
+import os
+import sys
+
+from build_cache import load_manifest, value_digest
+
+ASSETS_NAME = "assets.json"
+HASH_CHARS = 12
+
+
+def hashed_name(name, digest):
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{digest[:HASH_CHARS]}{ext}"
+
+
+def load_assets(dest_dir):
+    """assets.json of a publish directory, or None"""
+    try:
+        with open(os.path.join(dest_dir, ASSETS_NAME), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def publish(base_dir, outputs, dest_dir):
+    """
+    Copy {name: sha256} outputs of base_dir into dest_dir under their hashed
+    names and write assets.json. Raises ValueError if a file no longer has
+    the recorded hash. Returns (build id, files copied); files already
+    published are not copied again.
+    """
+    build_id = value_digest(outputs)
+    previous = load_assets(dest_dir)
+    if previous and previous.get("build") == build_id:
+        return build_id, 0
+    files, copied = {}, 0
+    for name in sorted(outputs):
+        digest = outputs[name]
+        target = hashed_name(name, digest)
+        path = os.path.join(dest_dir, target)
+        with open(os.path.join(base_dir, name), 'rb') as f:
+            data = f.read()
+        if hashlib.sha256(data).hexdigest() != digest:
+            raise ValueError(f"{name} does not match the build manifest")
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path + ".tmp", 'wb') as f:
+                f.write(data)
+            os.replace(path + ".tmp", path)
+            copied += 1
+        files[name] = {"file": target, "sha256": digest, "bytes": len(data)}
+
+    path = os.path.join(dest_dir, ASSETS_NAME)
+    with open(path + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump({"build": build_id, "files": files}, f, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(path + ".tmp", path)
+    return build_id, copied
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print(f"usage: {sys.argv[0]} BUILD_DIR PUBLISH_DIR")
+        sys.exit(1)
+    outputs = load_manifest(sys.argv[1]).get('outputs')
+    if not outputs:
+        print(f"{sys.argv[1]} has no build manifest")
+        sys.exit(1)
+    build_id, copied = publish(sys.argv[1], outputs, sys.argv[2])
+    print(f"build {build_id}: {copied} of {len(outputs)} files copied")
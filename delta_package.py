@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Delta packages between two data builds, and the applier.
+
+A package is a zip holding delta.json and one blob per changed file:
+    add      the new file, deflated
+    patch    copy / insert operations against the old file, deflated
+    delete   no blob
+Files whose hash did not change are not in the package at all. Every entry
+carries the SHA-256 of the file it expects to patch and of the result, and
+the package carries the new build manifest, so apply_delta() refuses a
+wrong base and verifies everything it writes.
+
+Patches are rsync-style block matching with content-defined blocks: block
+boundaries fall after a ',' , newline or NUL byte whose preceding WINDOW
+bytes hash to 0 mod DIVISOR. Boundaries depend only on nearby content, so
+an insertion only changes the blocks around it and the rest of the file
+still matches the old blocks by hash, wherever they moved to. The scan is
+a regex and a CRC per anchor, avoiding a per-byte rolling checksum in Python.
+SQLite databases are cut at their page size instead: their bytes have no
+such anchors, and an updated database keeps unchanged pages where they were
+(see search_index), so whole pages match.
+
+Patch ops (little-endian): b"C" offset u32 length u32 copies from the old
+file, b"I" length u32 + data inserts new bytes.
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import struct
+import sys
+import zipfile
+import zlib
+
+from build_cache import file_digest, load_manifest, save_manifest, value_digest
+
+DELTA_NAME = "delta.json"
+DELTA_VERSION = 1
+
+ANCHOR = re.compile(rb"[,\n\x00]")
+WINDOW = 16
+DIVISOR = 64
+MAX_BLOCK = 64 * 1024
+
+COPY = struct.Struct("<cII")
+INSERT = struct.Struct("<cI")
+
+SQLITE_MAGIC = b"SQLite format 3\x00"
+
+
+def block_bounds(data):
+    """End offsets of the content-defined blocks of data"""
+    bounds, last = [], 0
+    for m in ANCHOR.finditer(data):
+        end = m.end()
+        if end - last >= MAX_BLOCK:
+            bounds.extend(range(last + MAX_BLOCK, end, MAX_BLOCK))
+            last = bounds[-1]
+        if end - last >= WINDOW and zlib.crc32(data[end - WINDOW:end]) % DIVISOR == 0:
+            bounds.append(end)
+            last = end
+    bounds.extend(range(last + MAX_BLOCK, len(data), MAX_BLOCK))
+    if not bounds or bounds[-1] != len(data):
+        bounds.append(len(data))
+    return bounds
+
+
+def page_size(data):
+    """Page size of a SQLite database file, or None for any other data"""
+    if len(data) < 100 or not data.startswith(SQLITE_MAGIC):
+        return None
+    size = struct.unpack_from(">H", data, 16)[0]
+    return 65536 if size == 1 else size
+
+
+def _blocks(data, page=None):
+    if page:
+        for start in range(0, len(data), page):
+            yield start, min(start + page, len(data))
+        return
+    start = 0
+    for end in block_bounds(data):
+        if end > start:
+            yield start, end
+        start = end
+
+
+def make_patch(old, new):
+    """Copy / insert ops turning old into new"""
+    # Two databases with the same page size are matched page by page
+    page = page_size(new)
+    if page != page_size(old):
+        page = None
+    known = {}
+    for start, end in _blocks(old, page):
+        known.setdefault(hashlib.sha1(old[start:end]).digest(), (start, end - start))
+    ops = bytearray()
+    copy = None      # pending (offset, length) copy, merged while contiguous
+    insert = bytearray()
+
+    def flush_copy():
+        if copy:
+            ops.extend(COPY.pack(b"C", *copy))
+
+    for start, end in _blocks(new, page):
+        match = known.get(hashlib.sha1(new[start:end]).digest())
+        if match:
+            if insert:
+                ops.extend(INSERT.pack(b"I", len(insert)) + insert)
+                insert = bytearray()
+            if copy and copy[0] + copy[1] == match[0]:
+                copy = (copy[0], copy[1] + match[1])
+            else:
+                flush_copy()
+                copy = match
+        else:
+            flush_copy()
+            copy = None
+            insert += new[start:end]
+    flush_copy()
+    if insert:
+        ops.extend(INSERT.pack(b"I", len(insert)) + insert)
+    return bytes(ops)
+
+
+def apply_patch(old, ops):
+    """Inverse of make_patch"""
+    out = bytearray()
+    pos = 0
+    while pos < len(ops):
+        if ops[pos:pos + 1] == b"C":
+            _, offset, length = COPY.unpack_from(ops, pos)
+            pos += COPY.size
+            out += old[offset:offset + length]
+        else:
+            _, length = INSERT.unpack_from(ops, pos)
+            pos += INSERT.size
+            out += ops[pos:pos + length]
+            pos += length
+    return bytes(out)
+
+
+def _outputs(build_dir):
+    """{name: sha256} of a build, from its manifest"""
+    return dict(load_manifest(build_dir).get('outputs', {}))
+
+
+def make_delta(old_dir, new_dir, package_path):
+    """Write the package turning build old_dir into new_dir; returns delta.json as a dict"""
+    old_outputs = _outputs(old_dir)
+    new_manifest = load_manifest(new_dir)
+    new_outputs = new_manifest.get('outputs', {})
+    if not new_outputs:
+        raise ValueError(f"{new_dir} has no build manifest")
+    for name in new_outputs:
+        if name not in old_outputs:
+            # Older builds may not list every file; hash what is on disk
+            digest = file_digest(os.path.join(old_dir, name))
+            if digest:
+                old_outputs[name] = digest
+
+    files = []
+    tmp_path = package_path + ".tmp"
+    with zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_STORED) as package:
+        for name in sorted(new_outputs):
+            digest = new_outputs[name]
+            base = old_outputs.get(name)
+            if base == digest:
+                continue
+            with open(os.path.join(new_dir, name), 'rb') as f:
+                new = f.read()
+            full = zlib.compress(new, 9)
+            entry = {"name": name, "sha256": digest, "size": len(new)}
+            blob = full
+            if base:
+                with open(os.path.join(old_dir, name), 'rb') as f:
+                    patch = zlib.compress(make_patch(f.read(), new), 9)
+                if len(patch) < len(full):
+                    entry.update(action="patch", base_sha256=base)
+                    blob = patch
+            entry.setdefault("action", "add")
+            entry["blob"] = f"blobs/{len(files)}"
+            entry["blob_bytes"] = len(blob)
+            package.writestr(entry["blob"], blob)
+            files.append(entry)
+        for name in sorted(set(old_outputs) - set(new_outputs)):
+            files.append({"name": name, "action": "delete", "base_sha256": old_outputs[name]})
+
+        delta = {
+            "version": DELTA_VERSION,
+            "from": value_digest(old_outputs),
+            "to": value_digest(new_outputs),
+            "files": files,
+            "manifest": new_manifest,
+        }
+        package.writestr(DELTA_NAME, json.dumps(delta, indent=1), compress_type=zipfile.ZIP_DEFLATED)
+    os.replace(tmp_path, package_path)
+    return delta
+
+
+def apply_delta(old_dir, package_path, out_dir=None):
+    """
+    Rebuild the new build from old_dir and a package, into out_dir (a copy
+    of old_dir) or in place. Raises ValueError if a base file or a result
+    does not match its checksum; bases are all checked before anything is
+    written, and with out_dir old_dir is never modified.
+    """
+    if out_dir and os.path.abspath(out_dir) != os.path.abspath(old_dir):
+        if os.path.exists(out_dir):
+            raise ValueError(f"{out_dir} already exists")
+        shutil.copytree(old_dir, out_dir)
+    else:
+        out_dir = old_dir
+    with zipfile.ZipFile(package_path) as package:
+        delta = json.loads(package.read(DELTA_NAME))
+        if delta.get('version') != DELTA_VERSION:
+            raise ValueError(f"{package_path} is not a version {DELTA_VERSION} delta package")
+        # Check every base first so a wrong build is refused before any write
+        for entry in delta['files']:
+            if 'base_sha256' in entry and file_digest(os.path.join(out_dir, entry['name'])) != entry['base_sha256']:
+                raise ValueError(f"{entry['name']}: base does not match the package")
+        for entry in delta['files']:
+            path = os.path.join(out_dir, entry['name'])
+            if entry['action'] == "delete":
+                os.remove(path)
+                continue
+            data = zlib.decompress(package.read(entry['blob']))
+            if entry['action'] == "patch":
+                with open(path, 'rb') as f:
+                    data = apply_patch(f.read(), data)
+            if hashlib.sha256(data).hexdigest() != entry['sha256']:
+                raise ValueError(f"{entry['name']}: result does not match its checksum")
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path + ".tmp", 'wb') as f:
+                f.write(data)
+            os.replace(path + ".tmp", path)
+        save_manifest(out_dir, delta['manifest'])
+    return delta
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 5 and sys.argv[1] == "make":
+        delta = make_delta(sys.argv[2], sys.argv[3], sys.argv[4])
+        for entry in delta['files']:
+            print(f"{entry['action']:7} {entry.get('blob_bytes', 0):>10}  {entry['name']}")
+        print(f"{os.path.getsize(sys.argv[4])} bytes")
+    elif len(sys.argv) >= 4 and sys.argv[1] == "apply":
+        delta = apply_delta(sys.argv[2], sys.argv[3], sys.argv[4] if len(sys.argv) > 4 else None)
+        print(f"applied {len(delta['files'])} file changes")
+    else:
+        print(f"usage: {sys.argv[0]} make OLD_DIR NEW_DIR PACKAGE | apply OLD_DIR PACKAGE [OUT_DIR]")
+        sys.exit(1)
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate collapse of Ihya tafsir records.
+
+Repeated analysis runs and overlapping book passages give many records with
+almost the same english / arabic text. Each record is reduced to a set of
+word shingles and a MinHash signature; signatures are split into LSH bands,
+so a record is only compared with the passages sharing one of its band
+buckets instead of with every other record.
+
+Shingle hashes are built from per-word CRC32s rather than by hashing the
+joined shingle text. The signature is a one-permutation MinHash: every
+shingle is hashed once, the top bits of the hash pick one of NUM_BINS bins
+and each bin keeps its minimum. Empty bins borrow from the next filled bin (rotation
+densification), so short records still get full signatures.
+
+Passages are clustered online in file order: a record either joins the
+most similar existing passage (estimated Jaccard >= THRESHOLD) or starts a
+new one. A record whose passage is already attached to the same verse is a
+duplicate and is dropped. Only signatures, passage ids and exact content
+keys are kept, never the records.
+
+Across verses only byte-identical records are shared: near-duplicates of
+different verses differ in wording or book, and each verse keeps its own.
+Once every record is added, collapse() replaces the records whose exact
+content appears under several verses by {"passage": id} references, so
+ihya_passages.json holds them once instead of copies under every verse.
+
+sketch() is everything add() needs from a record. It is a module-level
+function so the ingest workers can compute it next to the parsing.
+"""
+import hashlib
+import json
+import re
+import zlib
+from array import array
+
+NUM_BINS = 64
+BIN_BITS = 6                     # 2 ** BIN_BITS == NUM_BINS
+VALUE_BITS = 32 - BIN_BITS
+BANDS = 16
+ROWS = NUM_BINS // BANDS
+THRESHOLD = 0.7
+
+_WORD = re.compile(r"\w+")
+_EMPTY = 1 << 32                 # larger than any bin value
+_MASK = 0xFFFFFFFF
+_VALUE_MASK = (1 << VALUE_BITS) - 1
+
+
+def _word_shingles(words, seed):
+    """32-bit hashes of the 3-word windows of words"""
+    h = [zlib.crc32(word.encode('utf-8'), seed) for word in words]
+    if 0 < len(h) < 3:
+        h += [seed] * (3 - len(h))  # short texts are one padded window
+    return {(a * 0x9E3779B1 ^ b * 0x85EBCA6B ^ c * 0xC2B2AE35) & _MASK
+            for a, b, c in zip(h, h[1:], h[2:])}
+
+
+def shingles(record):
+    """Hashed word 3-shingles of a record's english and arabic text"""
+    english = _WORD.findall(record.get('english', '').lower())
+    # The arabic snippets are quoted from the book as is, so plain words are
+    # enough; normalizing them would double the cost of shingling
+    arabic = record.get('arabic', '').split()
+    return _word_shingles(english, 1) | _word_shingles(arabic, 2)
+
+
+def signature(shingle_set):
+    """NUM_BINS-value one-permutation MinHash of a set of shingle hashes"""
+    bins = [_EMPTY] * NUM_BINS
+    # Largest first, so each bin ends up holding its minimum
+    for h in sorted([((shingle ^ shingle >> 16) * 0x45D9F3B) & _MASK for shingle in shingle_set], reverse=True):
+        bins[h >> VALUE_BITS] = h & _VALUE_MASK
+    if _EMPTY not in bins:
+        return array('I', bins)
+    if bins.count(_EMPTY) == NUM_BINS:
+        return array('I', [0] * NUM_BINS)
+    sig = array('I', [0]) * NUM_BINS
+    for i in range(NUM_BINS):
+        # Rotation densification: an empty bin takes the next filled bin's
+        # value, offset by the distance so it does not collide with it
+        for distance in range(NUM_BINS):
+            value = bins[(i + distance) % NUM_BINS]
+            if value != _EMPTY:
+                sig[i] = (value + (distance << VALUE_BITS)) & _MASK
+                break
+    return sig
+
+
+def content_key(record):
+    """Digest of a record's exact content, book included"""
+    data = json.dumps(record, sort_keys=True, ensure_ascii=False).encode('utf-8')
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+def sketch(record):
+    """(signature, content key) of a record, as add() takes it"""
+    return signature(shingles(record)), content_key(record)
+
+
+def similarity(a, b):
+    """Estimated Jaccard similarity of two signatures"""
+    return sum(x == y for x, y in zip(a, b)) / NUM_BINS
+
+
+class PassageIndex:
+    """Online LSH clustering of records into passages, per verse"""
+
+    def __init__(self, threshold=THRESHOLD):
+        self.threshold = threshold
+        self.verses = {}             # ref -> [passage ids] of its kept records
+        self.duplicates = 0
+        self._signatures = []
+        self._buckets = [{} for _ in range(BANDS)]
+        self._uses = {}              # content key -> verses keeping that exact record
+        self._shared_ids = None      # content key -> id in ihya_passages.json, set by collapse()
+        self._stored = 0
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def _find(self, sig):
+        candidates = set()
+        for band, buckets in enumerate(self._buckets):
+            key = tuple(sig[band * ROWS:(band + 1) * ROWS])
+            candidates.update(buckets.get(key, ()))
+        best, best_score = None, self.threshold
+        for pid in sorted(candidates):
+            score = similarity(sig, self._signatures[pid])
+            if score >= best_score:
+                best, best_score = pid, score
+        return best
+
+    def add(self, ref, record, sketched=None):
+        """
+        Attach record to ref; False if ref already has a near-duplicate of it.
+        sketched is sketch(record) if it was already computed.
+        """
+        sig, key = sketched or sketch(record)
+        pid = self._find(sig)
+        if pid is None:
+            pid = len(self._signatures)
+            self._signatures.append(sig)
+            for band, buckets in enumerate(self._buckets):
+                buckets.setdefault(tuple(sig[band * ROWS:(band + 1) * ROWS]), []).append(pid)
+        pids = self.verses.setdefault(ref, [])
+        if pid in pids:
+            self.duplicates += 1
+            return False
+        pids.append(pid)
+        # An identical record is a duplicate of itself, so keys count verses
+        self._uses[key] = self._uses.get(key, 0) + 1
+        return True
+
+    def collapse(self, ref, records):
+        """
+        (records, new passages) for the kept records of ref, once every record
+        has been added. Records whose exact content is kept by other verses
+        too become {"passage": id}; the first time such a record is met it is
+        returned in new passages, to be stored as passage id. Ids count up
+        from 0 in the order verses are collapsed.
+        """
+        if self._shared_ids is None:
+            self._shared_ids = {key: None for key, uses in self._uses.items() if uses > 1}
+            self._uses = None
+        collapsed, new = [], []
+        for record in records:
+            key = content_key(record) if self._shared_ids else None
+            if key not in self._shared_ids:
+                collapsed.append(record)
+                continue
+            shared_id = self._shared_ids[key]
+            if shared_id is None:
+                shared_id = self._shared_ids[key] = self._stored
+                self._stored += 1
+                new.append(record)
+            collapsed.append({"passage": shared_id})
+        return collapsed, new
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Ingestion of deepseek_analysis_results.jsonl.
+
+Three ways to turn the JSONL into {verse_ref: [records]}:
+  ingest(path, parse_entry)           serial, one core
+  ingest(path, parse_entry, jobs=N)   byte-range chunks parsed by a process
+                                      pool, merged in file order
+  ingest_streaming(path, parse_entry, out_path)
+                                      writes the JSON object verse by verse,
+                                      holding at most one surah in memory;
+                                      takes jobs=N as well
+
+parse_entry(entry) gets one decoded JSON line and returns (ref, record) or
+None to skip it. It must be a module-level function so the process pool can
+pickle it, as must sketch(record), the per-record work the caller's keep()
+needs, which the workers compute next to the parsing. All modes yield the
+same records per verse in the same order, and the verses in ref_order(), so
+the output does not depend on where in the file a verse first appears.
+"""
+import json
+import os
+import shutil
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+CHUNKS_PER_JOB = 4
+CHUNK_BYTES = 16 << 20           # at most this much JSONL per worker task
+
+
+def chunk_ranges(path, chunks):
+    """Split path into up to `chunks` (start, end) byte ranges on line boundaries"""
+    size = os.path.getsize(path)
+    bounds = [0]
+    with open(path, 'rb') as f:
+        for i in range(1, chunks):
+            f.seek(max(size * i // chunks, bounds[-1]))
+            if f.tell() > 0:
+                f.readline()  # finish the line we landed in
+            bounds.append(min(f.tell(), size))
+    bounds.append(size)
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+
+def iter_entries(path, start=0, end=None):
+    """Decoded JSON objects for the lines starting in [start, end)"""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while end is None or f.tell() < end:
+            line = f.readline()
+            if not line:
+                break
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def _parse_range(path, start, end, parse_entry, sketch):
+    for entry in iter_entries(path, start, end):
+        parsed = parse_entry(entry)
+        if parsed:
+            ref, record = parsed
+            yield ref, record, sketch(record) if sketch else None
+
+
+def _ingest_range(args):
+    return list(_parse_range(*args))
+
+
+def iter_parsed(path, parse_entry, jobs=1, sketch=None):
+    """
+    (ref, record, sketch(record) or None) for every parsed line, in file
+    order. With jobs > 1 a process pool parses byte-range chunks, a few at a
+    time, so only the chunks in flight are held in memory.
+    """
+    if not os.path.exists(path):
+        return
+    if jobs <= 1:
+        yield from _parse_range(path, 0, None, parse_entry, sketch)
+        return
+    chunks = max(jobs * CHUNKS_PER_JOB, -(-os.path.getsize(path) // CHUNK_BYTES))
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        running = deque()
+        for start, end in chunk_ranges(path, chunks):
+            running.append(pool.submit(_ingest_range, (path, start, end, parse_entry, sketch)))
+            if len(running) > 2 * jobs:
+                yield from running.popleft().result()
+        while running:
+            yield from running.popleft().result()
+
+
+def ingest(path, parse_entry, jobs=1, keep=None, sketch=None):
+    """
+    {ref: [records]} for the whole file in ref_order(), using `jobs` worker
+    processes. keep(ref, record, sketched), if given, is called in file order
+    with sketch(record) (None without sketch) and drops the record when it
+    returns False.
+    """
+    merged = {}
+    for ref, record, sketched in iter_parsed(path, parse_entry, jobs, sketch):
+        if keep and not keep(ref, record, sketched):
+            continue
+        merged.setdefault(ref, []).append(record)
+    return {ref: merged[ref] for ref in sorted(merged, key=ref_order)}
+
+
+def ref_order(ref):
+    """Sort key putting sura:ayah refs in verse order and any other refs last"""
+    sura, _, ayah = ref.partition(':')
+    if sura.isdigit() and ayah.isdigit():
+        return 0, int(sura), int(ayah), ""
+    return 1, 0, 0, ref
+
+
+def _surah_bucket(ref):
+    order = ref_order(ref)
+    return order[1] if order[0] == 0 else 0
+
+
+def ingest_streaming(path, parse_entry, out_path, keep=None, emit=None, jobs=1, sketch=None):
+    """
+    Write {ref: [records]} to out_path as JSON without building it in memory.
+
+    Records are first spilled to one JSONL file per surah, then each surah is
+    grouped and appended to the output on its own. Verses come out in
+    ref_order(), records keep file order.
+    keep and sketch are as for ingest(); emit(ref, records), if given, is
+    called for every verse before it is written and returns the records to
+    write for it. Returns the set of refs written.
+    """
+    refs = set()
+    spill_dir = tempfile.mkdtemp(prefix="ihya_spill_")
+    try:
+        spills = {}
+        for ref, record, sketched in iter_parsed(path, parse_entry, jobs, sketch):
+            if keep and not keep(ref, record, sketched):
+                continue
+            bucket = _surah_bucket(ref)
+            spill = spills.get(bucket)
+            if spill is None:
+                spill = spills[bucket] = open(os.path.join(spill_dir, f"{bucket}.jsonl"), 'w', encoding='utf-8')
+            spill.write(json.dumps([ref, record]))
+            spill.write("\n")
+        for spill in spills.values():
+            spill.close()
+
+        with open(out_path, 'w') as out:
+            out.write("{")
+            first = True
+            for bucket in sorted(spills, key=lambda b: (b == 0, b)):
+                verses = {}
+                with open(os.path.join(spill_dir, f"{bucket}.jsonl"), 'r', encoding='utf-8') as f:
+                    for line in f:
+                        ref, record = json.loads(line)
+                        verses.setdefault(ref, []).append(record)
+                for ref in sorted(verses, key=ref_order):
+                    records = verses[ref]
+                    if emit:
+                        records = emit(ref, records)
+                    if not first:
+                        out.write(", ")
+                    out.write(json.dumps(ref))
+                    out.write(": ")
+                    json.dump(records, out)
+                    first = False
+                refs.update(verses)
+            out.write("}")
+    finally:
+        shutil.rmtree(spill_dir, ignore_errors=True)
+    return refs
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Per-surah export of the tafsir in kathir.db (tafsir_kathir).
+
+Each row's HTML is split into its sections (the <div>s, with their text
+direction and <b> title) and every section into paragraphs at <br/>. Long
+paragraphs are cut at sentence ends, and paragraphs are packed into chunks
+of about CHUNK_CHARS characters so a reader can show a commentary page by
+page.
+
+For every surah with commentary two files are written:
+    kathir/surah_N.txt    UTF-8 text of all chunks, back to back
+    kathir/surah_N.json   entries with their verse range and, per section,
+                          the [byte offset, byte length] of each chunk
+and kathir/index.json lists the surahs with their file sizes. A reader
+loads the small .json and seeks into the .txt for the chunk on screen.
+"""
+import html
+import json
+import os
+import re
+import sys
+
+KATHIR_DIR = "kathir"
+INDEX_NAME = "index.json"
+CHUNK_CHARS = 1024
+
+_SECTION = re.compile(r'<div\b([^>]*)>(.*?)</div>', re.S)
+_DIR = re.compile(r'dir="(\w+)"')
+_TITLE = re.compile(r'^\s*<b>(.*?)</b>\s*(?:<br\s*/?>)?', re.S)
+_BREAK = re.compile(r'<br\s*/?>')
+_TAG = re.compile(r'<[^>]+>')
+_SENTENCE_END = re.compile(r'[.!?؟،؛:]\s')
+
+
+def surah_text_name(sura_num):
+    return f"{KATHIR_DIR}/surah_{sura_num}.txt"
+
+
+def surah_index_name(sura_num):
+    return f"{KATHIR_DIR}/surah_{sura_num}.json"
+
+
+def _clean(fragment):
+    return " ".join(html.unescape(_TAG.sub("", fragment)).split())
+
+
+def parse_sections(tafsir_html):
+    """[(dir, title, [paragraphs])] of one tafsir_text value"""
+    sections = []
+    for attrs, body in _SECTION.findall(tafsir_html):
+        direction = _DIR.search(attrs)
+        title = _TITLE.match(body)
+        if title:
+            body = body[title.end():]
+        paragraphs = [p for p in map(_clean, _BREAK.split(body)) if p]
+        sections.append((direction.group(1) if direction else "auto",
+                         _clean(title.group(1)) if title else "", paragraphs))
+    if not sections:
+        paragraphs = [p for p in map(_clean, _BREAK.split(tafsir_html)) if p]
+        sections.append(("auto", "", paragraphs))
+    return sections
+
+
+def _split_long(paragraph, limit):
+    """Pieces of at most ~limit characters, cut after sentence punctuation where possible"""
+    pieces = []
+    while len(paragraph) > limit:
+        cut = 0
+        for m in _SENTENCE_END.finditer(paragraph, 0, limit):
+            cut = m.end()
+        if cut < limit // 2:
+            cut = paragraph.rfind(" ", 0, limit) + 1 or limit
+        pieces.append(paragraph[:cut].rstrip())
+        paragraph = paragraph[cut:].lstrip()
+    if paragraph:
+        pieces.append(paragraph)
+    return pieces
+
+
+def chunk_paragraphs(paragraphs, limit=CHUNK_CHARS):
+    """Paragraphs packed into chunks of about limit characters, joined by newlines"""
+    chunks, current = [], ""
+    for paragraph in paragraphs:
+        for piece in _split_long(paragraph, limit):
+            if current and len(current) + 1 + len(piece) > limit:
+                chunks.append(current)
+                current = ""
+            current = f"{current}\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def group_rows(rows):
+    """
+    (sura, first ayah, last ayah, html) from (sura, ayah, html) rows in
+    verse order; consecutive verses sharing one commentary become one entry.
+    """
+    entry = None
+    for sura, ayah, text in rows:
+        if entry and entry[0] == sura and entry[2] + 1 == ayah and entry[3] == text:
+            entry[2] = ayah
+            continue
+        if entry:
+            yield tuple(entry)
+        entry = [sura, ayah, ayah, text or ""]
+    if entry:
+        yield tuple(entry)
+
+
+def _dump(base_dir, name, data):
+    with open(os.path.join(base_dir, name), 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+
+
+def export_kathir(base_dir, index, rows, chunk_chars=CHUNK_CHARS):
+    """
+    Write the per-surah files from (sura, ayah, tafsir_text) rows in verse
+    order. Rows that are not a verse of index are skipped. Returns
+    (entries exported, relative names of all files written).
+    """
+    os.makedirs(os.path.join(base_dir, KATHIR_DIR), exist_ok=True)
+    surahs = {}
+    for sura, first, last, text in group_rows(rows):
+        if not index.vid(sura, first):
+            continue
+        last = min(last, index.counts[sura - 1])
+        surahs.setdefault(sura, []).append((first, last, text))
+
+    written, listing, exported = [], [], 0
+    for sura in sorted(surahs):
+        body = bytearray()
+        entries = []
+        for first, last, text in surahs[sura]:
+            sections = []
+            for direction, title, paragraphs in parse_sections(text):
+                spans = []
+                for chunk in chunk_paragraphs(paragraphs, chunk_chars):
+                    data = chunk.encode('utf-8')
+                    spans.append([len(body), len(data)])
+                    body += data
+                sections.append({"dir": direction, "title": title, "chunks": spans})
+            entry = {"ayah": first, "vid": index.vid(sura, first), "sections": sections}
+            if last != first:
+                entry["last"] = last
+            entries.append(entry)
+        exported += len(entries)
+
+        text_name = surah_text_name(sura)
+        with open(os.path.join(base_dir, text_name), 'wb') as f:
+            f.write(body)
+        index_name = surah_index_name(sura)
+        _dump(base_dir, index_name, {"surah": sura, "text": os.path.basename(text_name), "entries": entries})
+        written += [text_name, index_name]
+        listing.append({
+            "surah": sura,
+            "file": index_name,
+            "text": text_name,
+            "entries": len(entries),
+            "bytes": os.path.getsize(os.path.join(base_dir, index_name)),
+            "text_bytes": len(body),
+        })
+
+    # Drop shards of surahs that no longer have commentary
+    for name in os.listdir(os.path.join(base_dir, KATHIR_DIR)):
+        path = f"{KATHIR_DIR}/{name}"
+        if name != INDEX_NAME and path not in written:
+            os.remove(os.path.join(base_dir, path))
+
+    name = f"{KATHIR_DIR}/{INDEX_NAME}"
+    _dump(base_dir, name, {"chunk_chars": chunk_chars, "surahs": listing})
+    written.append(name)
+    return exported, written
+
+
+class KathirReader:
+    """Pages through the exported commentary, reading one chunk at a time"""
+
+    def __init__(self, base_dir):
+        self.base_dir = base_dir
+        self._surahs = {}
+
+    def entries(self, sura):
+        """Entry list of one surah, [] if it has no commentary"""
+        if sura not in self._surahs:
+            path = os.path.join(self.base_dir, surah_index_name(sura))
+            if not os.path.exists(path):
+                return []
+            with open(path, 'r', encoding='utf-8') as f:
+                self._surahs[sura] = json.load(f)['entries']
+        return self._surahs[sura]
+
+    def entry(self, sura, ayah):
+        """The entry covering sura:ayah, or None"""
+        for entry in self.entries(sura):
+            if entry['ayah'] <= ayah <= entry.get('last', entry['ayah']):
+                return entry
+        return None
+
+    def chunk(self, sura, span):
+        """Text of one [offset, length] chunk span"""
+        offset, length = span
+        with open(os.path.join(self.base_dir, surah_text_name(sura)), 'rb') as f:
+            f.seek(offset)
+            return f.read(length).decode('utf-8')
+
+    def pages(self, sura, ayah):
+        """(dir, title, chunk text) for every chunk of sura:ayah, read lazily"""
+        entry = self.entry(sura, ayah)
+        if entry is None:
+            return
+        for section in entry['sections']:
+            for span in section['chunks']:
+                yield section['dir'], section['title'], self.chunk(sura, span)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print(f"usage: {sys.argv[0]} ASSETS_DIR SURA:AYAH")
+        sys.exit(1)
+    sura, ayah = (int(x) for x in sys.argv[2].split(':'))
+    for direction, title, text in KathirReader(sys.argv[1]).pages(sura, ayah):
+        print(f"--- {title} ({direction})")
+        print(text)
@@ -6,6 +6,8 @@ import json
 import sqlite3
 import os
 
+import ihya_ingest
+
 BASE_DIR = "/home/absolut7/Documents/26apps/ihyatafsir-android/assets"
 ALQURAN_DB_DIR = "/home/absolut7/Documents/alquranapk/Al.Quran.ver.1.20.1.build.115_decompiled/assets/databases"
 IHYA_JSONL = "/home/absolut7/Documents/ihyalovesecond/deepseek_analysis_results.jsonl"
@@ -185,42 +187,34 @@ def process_word_by_word():
     print(f"  Processed words for {len(words)} verses")
     return words
 
-def process_ihya_tafsir():
-    """Process Ihya Tafsir from deepseek_analysis_results.jsonl"""
-    print("Processing Ihya Tafsir...")
-    tafsir = {}
-    tafsir_count = 0
+def parse_ihya_entry(entry):
+    """(verse_ref, tafsir record) for a JSONL entry with substantial commentary"""
+    verse_ref = entry.get('custom_id', '')  # Format: "2:2" or "4:110"
+    
+    if ':' not in verse_ref:
+        return None
+    
+    analysis = entry.get('analysis', {})
+    analysis_type = analysis.get('analysis_type', '')
     
-    with open(IHYA_JSONL, 'r', encoding='utf-8') as f:
-        for line in f:
-            try:
-                entry = json.loads(line.strip())
-                verse_ref = entry.get('custom_id', '')  # Format: "2:2" or "4:110"
-                
-                if ':' not in verse_ref:
-                    continue
-                
-                analysis = entry.get('analysis', {})
-                analysis_type = analysis.get('analysis_type', '')
-                
-                # Only include entries with actual tafsir commentary
-                arabic_text = analysis.get('arabic_snippet', '')
-                english_text = analysis.get('english_text', '')
-                
-                if english_text and len(english_text) > 50:  # Substantial commentary
-                    if verse_ref not in tafsir:
-                        tafsir[verse_ref] = []
-                    
-                    tafsir[verse_ref].append({
-                        "arabic": arabic_text[:500] if arabic_text else "",
-                        "english": english_text,
-                        "type": analysis_type,
-                        "book": entry.get('file', '').replace('.txt', '')
-                    })
-                    tafsir_count += 1
-                    
-            except json.JSONDecodeError:
-                continue
+    # Only include entries with actual tafsir commentary
+    arabic_text = analysis.get('arabic_snippet', '')
+    english_text = analysis.get('english_text', '')
+    
+    if english_text and len(english_text) > 50:  # Substantial commentary
+        return verse_ref, {
+            "arabic": arabic_text[:500] if arabic_text else "",
+            "english": english_text,
+            "type": analysis_type,
+            "book": entry.get('file', '').replace('.txt', '')
+        }
+    return None
+
+def process_ihya_tafsir(jobs=None):
+    """Process Ihya Tafsir from deepseek_analysis_results.jsonl, with `jobs` parser processes if given"""
+    print("Processing Ihya Tafsir...")
+    tafsir = ihya_ingest.ingest(IHYA_JSONL, parse_ihya_entry, jobs or 1)
+    tafsir_count = sum(len(entries) for entries in tafsir.values())
     
     print(f"  Processed {tafsir_count} Ihya tafsir entries for {len(tafsir)} unique verses")
     return tafsir
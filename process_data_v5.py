@@ -2,13 +2,39 @@
 """
 Process Quran data v5 - Book Titles & UI Polish
 """
+import argparse
 import json
-import sqlite3
 import os
+import threading
+
+from arabic_text import word_letters
+import arabic_index
+import build_cache
+import content_store
+from delta_package import make_delta
+from build_report import BuildReport
+import ihya_dedup
+import ihya_ingest
+import kathir_export
+import navigation
+import search_index
+import stage_graph
+import topic_index
+import translation_shards
+from verse_bitmap import VerseSet, read_bitmaps, write_bitmaps
+from source_catalog import SourceCatalog
+import tafsir_store
+import tajweed
+import verse_shards
+import verse_store
+import word_forms
+from verse_index import VerseIndex, WordTable
 
 BASE_DIR = "/home/absolut7/Documents/26apps/ihyatafsir-android/assets"
 ALQURAN_DB_DIR = "/home/absolut7/Documents/alquranapk/Al.Quran.ver.1.20.1.build.115_decompiled/assets/databases"
 IHYA_JSONL = "/home/absolut7/Documents/ihyalovesecond/deepseek_analysis_results.jsonl"
+KATHIR_DB = None  # default: databases/kathir.db under BASE_DIR
+QURANINDEX_DB = None  # default: databases/quranindex.db under BASE_DIR
 
 # Mapping specific filenames to Book Titles
 BOOK_TITLES = {
@@ -61,6 +87,40 @@ BOOK_TITLES = {
     "vol4_Vol4-book10": "Remembrance of Death and Afterlife"
 }
 
+def configure_paths(base_dir=None, alquran_db_dir=None, ihya_jsonl=None, kathir_db=None, quranindex_db=None):
+    """Point the build at other source / output locations"""
+    global BASE_DIR, ALQURAN_DB_DIR, IHYA_JSONL, KATHIR_DB, QURANINDEX_DB
+    if base_dir:
+        BASE_DIR = base_dir
+    if alquran_db_dir:
+        ALQURAN_DB_DIR = alquran_db_dir
+    if ihya_jsonl:
+        IHYA_JSONL = ihya_jsonl
+    if kathir_db:
+        KATHIR_DB = kathir_db
+    if quranindex_db:
+        QURANINDEX_DB = quranindex_db
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+def source_catalog():
+    """Shared read-only connections to the source databases"""
+    global _catalog
+    paths = {name: path for name, path in source_paths().items() if name != "ihya"}
+    with _catalog_lock:
+        if _catalog is None or _catalog.paths != paths:
+            if _catalog is not None:
+                _catalog.close()
+            _catalog = SourceCatalog(paths)
+        return _catalog
+
+def close_source_catalog():
+    global _catalog
+    if _catalog is not None:
+        _catalog.close()
+        _catalog = None
+
 def get_book_title(filename):
     # Try exact match first
     base = filename.replace('_en', '').replace('.txt', '')
@@ -75,14 +135,7 @@ def get_book_title(filename):
     return filename.replace('_', ' ').replace('-', ' ').title()
 
 def get_surahs():
-    conn = sqlite3.connect(f"{ALQURAN_DB_DIR}/quran.db")
-    cursor = conn.cursor()
-    cursor.execute("SELECT sura, ayah, text FROM verses ORDER BY sura, ayah")
-    surah_verses = {}
-    for row in cursor:
-        sura = row[0]
-        surah_verses[sura] = surah_verses.get(sura, 0) + 1
-    conn.close()
+    surah_verses = source_catalog().surah_counts("quran")
     
     surahs = [
         {"number": 1, "name": "Al-Fatihah", "arabic": "الفاتحة", "type": "Meccan"},
@@ -204,108 +257,679 @@ def get_surahs():
         s['verses'] = surah_verses.get(s['number'], 0)
     return surahs
 
-def process_data():
-    print("Processing Quran verses & Translations (v5)...")
-    
-    # LOAD DBs
-    conn_quran = sqlite3.connect(f"{ALQURAN_DB_DIR}/quran.db")
-    cursor_quran = conn_quran.cursor()
-    cursor_quran.execute("SELECT sura, ayah, text FROM verses ORDER BY sura, ayah")
-    verses_text = {f"{r[0]}:{r[1]}": r[2] for r in cursor_quran}
-    conn_quran.close()
-    
-    conn_trans = sqlite3.connect(f"{ALQURAN_DB_DIR}/en_sahih.db")
-    cursor_trans = conn_trans.cursor()
-    cursor_trans.execute("SELECT sura, ayah, text FROM verses ORDER BY sura, ayah")
-    translations = {f"{r[0]}:{r[1]}": r[2] for r in cursor_trans}
-    conn_trans.close()
-
-    print("Processing Word-by-Word data (Corpus + Words)...")
-    # WORDS (Translit)
-    conn_words = sqlite3.connect(f"{ALQURAN_DB_DIR}/words.db")
-    cursor_words = conn_words.cursor()
-    cursor_words.execute("SELECT sura, ayah, word, en FROM allwords ORDER BY sura, ayah, word")
-    words_map = {}
-    for r in cursor_words:
-        key = f"{r[0]}:{r[1]}:{r[2]}"
-        words_map[key] = {"translit": r[3] if r[3] else ""}
-    conn_words.close()
-    
-    # CORPUS (Arabic)
-    conn_corpus = sqlite3.connect(f"{ALQURAN_DB_DIR}/corpus.db")
-    cursor_corpus = conn_corpus.cursor()
-    cursor_corpus.execute("SELECT surah, ayah, word, ar1, ar2, ar3, ar4, ar5 FROM corpus ORDER BY surah, ayah, word")
+def source_paths():
+    return {
+        "quran": f"{ALQURAN_DB_DIR}/quran.db",
+        "en_sahih": f"{ALQURAN_DB_DIR}/en_sahih.db",
+        "words": f"{ALQURAN_DB_DIR}/words.db",
+        "corpus": f"{ALQURAN_DB_DIR}/corpus.db",
+        "ihya": IHYA_JSONL,
+        "kathir": KATHIR_DB or f"{BASE_DIR}/databases/kathir.db",
+        "quranindex": QURANINDEX_DB or f"{BASE_DIR}/databases/quranindex.db",
+        **{name: spec[0] for name, spec in translation_sources().items()},
+    }
+
+def translation_sources():
+    """
+    Translation registry: name -> (database path, table, language). Each
+    is extracted to translations/<name>.json; adding a language is one entry.
+    """
+    return {
+        "en_sahih": (f"{ALQURAN_DB_DIR}/en_sahih.db", "verses", "en"),
+        "quran_ar": (f"{ALQURAN_DB_DIR}/quran_ar.db", "verses", "ar"),      # unvocalized text
+        "quran_indo": (f"{ALQURAN_DB_DIR}/quran_indo.db", "verses", "ar"),  # Indo-Pak script
+    }
+
+def load_verse_column(source, index):
+    """verses.text of a quran.db-style source as a list indexed by verse id"""
+    texts = [""] * (len(index) + 1)
+    for sura, ayah, text in source_catalog().verse_rows(source):
+        vid = index.vid(sura, ayah)
+        if vid:
+            texts[vid] = text
+    return texts
+
+def load_translation_sources(index, loaded=None):
+    """
+    {name: (language, texts by verse id)} of every registered translation on
+    disk. Texts another stage already read are passed as loaded {name: texts}
+    and not read again.
+    """
+    translations = {}
+    catalog = source_catalog()
+    for name, (path, table, language) in translation_sources().items():
+        if loaded and name in loaded:
+            translations[name] = (language, loaded[name])
+            continue
+        if not os.path.exists(path):
+            print(f"  {name}: {path} not found, skipped")
+            continue
+        texts = [""] * (len(index) + 1)
+        for sura, ayah, text in catalog.verse_rows(name, "text", table):
+            vid = index.vid(sura, ayah)
+            if vid:
+                texts[vid] = text
+        translations[name] = (language, texts)
+    return translations
+
+def load_verses_text(index):
+    return load_verse_column("quran", index)
+
+def load_translations(index):
+    return load_verse_column("en_sahih", index)
+
+# Arabic segments from corpus.db joined with the transliteration in words.db,
+# concatenated and ordered by SQLite rather than through a Python dict
+WORDS_JOIN_SQL = """
+    SELECT c.surah, c.ayah, c.word,
+           COALESCE(c.ar1, '') || COALESCE(c.ar2, '') || COALESCE(c.ar3, '')
+               || COALESCE(c.ar4, '') || COALESCE(c.ar5, ''),
+           COALESCE(a.en, '')
+    FROM corpus AS c
+    LEFT JOIN w.allwords AS a
+        ON a.sura = c.surah AND a.ayah = c.ayah AND a.word = c.word
+    ORDER BY c.surah, c.ayah, c.word
+"""
+
+def load_words(index):
+    conn = source_catalog().attach("corpus", "words", "w")
     
-    verses_words = {}
-    for r in cursor_corpus:
-        sura, ayah, word_num = r[0], r[1], r[2]
-        arabic_word = "".join([seg for seg in r[3:] if seg])
-        
-        word_key = f"{sura}:{ayah}:{word_num}"
-        verse_key = f"{sura}:{ayah}"
-        
-        if verse_key not in verses_words:
-            verses_words[verse_key] = []
-            
-        translit = ""
-        if word_key in words_map:
-            translit = words_map[word_key]["translit"]
-            
-        verses_words[verse_key].append({
-            "id": word_num,
-            "arabic": arabic_word,
-            "translit": translit
-        })
-    conn_corpus.close()
-
-    print("Processing Ihya Tafsir with Book Titles...")
-    ihya_tafsir = {}
-    if os.path.exists(IHYA_JSONL):
-        with open(IHYA_JSONL, 'r', encoding='utf-8') as f:
-            for line in f:
-                try:
-                    entry = json.loads(line.strip())
-                    ref = entry.get('custom_id', '')
-                    if ':' in ref and entry.get('analysis', {}).get('english_text'):
-                        if ref not in ihya_tafsir:
-                            ihya_tafsir[ref] = []
-                        filename = entry.get('file', '')
-                        ihya_tafsir[ref].append({
-                            "arabic": entry['analysis'].get('arabic_snippet', '')[:500],
-                            "english": entry['analysis'].get('english_text', ''),
-                            "book_file": filename,
-                            "book_title": get_book_title(filename)
-                        })
-                except:
-                    continue
-
-    print("Building final JSONs...")
-    surahs = get_surahs()
-    combined_verses = {}
-    for sura in surahs:
-        sura_num = sura['number']
-        combined_verses[sura_num] = []
-        for i in range(1, sura['verses'] + 1):
-            key = f"{sura_num}:{i}"
-            wbw = verses_words.get(key, [])
-            wbw.sort(key=lambda x: x['id'])
-            
-            combined_verses[sura_num].append({
-                "ayah": i,
-                "text": verses_text.get(key, ""),
-                "translation": translations.get(key, ""),
-                "words": wbw,
-                "hasIhya": key in ihya_tafsir
-            })
-
-    with open(f"{BASE_DIR}/surahs.json", 'w') as f:
-        json.dump(surahs, f)
-    with open(f"{BASE_DIR}/verses_v4.json", 'w') as f: # Overwrite v4
-        json.dump(combined_verses, f)
-    with open(f"{BASE_DIR}/ihya_tafsir.json", 'w') as f:
-        json.dump(ihya_tafsir, f)
-        
+    words = WordTable()
+    aligned = {}  # most words repeat; align each distinct spelling once
+    for sura, ayah, word_num, arabic_word, translit in conn.execute(WORDS_JOIN_SQL):
+        vid = index.vid(sura, ayah)
+        if vid:
+            # The JSON outputs drop word ids: a word's id is its position + 1
+            if word_num != len(words.rows(vid)) + 1:
+                raise ValueError(f"corpus.db {sura}:{ayah} has word {word_num} where word "
+                                 f"{len(words.rows(vid)) + 1} was expected")
+            key = (arabic_word, translit)
+            if key not in aligned:
+                clean, letters = word_letters(arabic_word, translit)
+                aligned[key] = (clean, tuple(letters))
+            words.append(vid, word_num, arabic_word, *aligned[key])
+    words.intern_forms()
+    return words
+
+def iter_kathir_rows():
+    """(surah, ayah, tafsir_text) of kathir.db in verse order, read through its index"""
+    catalog = source_catalog()
+    if not os.path.exists(catalog.paths["kathir"]):
+        return iter(())
+    return catalog.connect("kathir").execute(
+        "SELECT surah, ayah, tafsir_text FROM tafsir_kathir ORDER BY surah, ayah")
+
+def kathir_vids(index):
+    """Verse ids with a kathir.db commentary"""
+    catalog = source_catalog()
+    if not os.path.exists(catalog.paths["kathir"]):
+        return []
+    rows = catalog.connect("kathir").execute("SELECT surah, ayah FROM tafsir_kathir")
+    return [vid for vid in (index.vid(sura, ayah) for sura, ayah in rows) if vid]
+
+def iter_topic_rows():
+    """(en, Verses, tags) of every quranindex.db topic"""
+    catalog = source_catalog()
+    if not os.path.exists(catalog.paths["quranindex"]):
+        return []
+    return catalog.connect("quranindex").execute("SELECT en, Verses, tags FROM quranindex ORDER BY en, Verses, tags").fetchall()
+
+def iter_corpus_rows():
+    """(surah, ayah, word, ar1..ar5) rows of corpus.db in word order"""
+    return source_catalog().connect("corpus").execute(
+        "SELECT surah, ayah, word, ar1, ar2, ar3, ar4, ar5 FROM corpus ORDER BY surah, ayah, word")
+
+def parse_ihya_entry(entry):
+    try:
+        ref = entry.get('custom_id', '')
+        if ':' in ref and entry.get('analysis', {}).get('english_text'):
+            filename = entry.get('file', '')
+            return ref, {
+                "arabic": entry['analysis'].get('arabic_snippet', '')[:500],
+                "english": entry['analysis'].get('english_text', ''),
+                "book_file": filename,
+                "book_title": get_book_title(filename)
+            }
+    except:
+        pass
+    return None
+
+def load_ihya_tafsir(jobs=1, stream=False, passages=None, emit=None):
+    """
+    {ref: [entries]} from the Ihya JSONL, parsed by `jobs` processes. With
+    stream=True ihya_tafsir.json is written while reading and only the set of
+    refs is kept and returned.
+    Given an ihya_dedup.PassageIndex, near-duplicate entries of a verse are
+    dropped and every entry is recorded in it. emit(ref, entries), if given, is
+    called once per verse, in verse order, with its final entries and returns
+    the entries to keep for it.
+    """
+    # The parser processes also compute the signatures the passage index needs
+    keep, sketch = (passages.add, ihya_dedup.sketch) if passages is not None else (None, None)
+    if stream:
+        return ihya_ingest.ingest_streaming(IHYA_JSONL, parse_ihya_entry, f"{BASE_DIR}/ihya_tafsir.json",
+                                            keep, emit, jobs, sketch)
+    ihya_tafsir = ihya_ingest.ingest(IHYA_JSONL, parse_ihya_entry, jobs, keep, sketch)
+    if emit:
+        ihya_tafsir = {ref: emit(ref, entries) for ref, entries in ihya_tafsir.items()}
+    return ihya_tafsir
+
+def iter_ihya_entries(index, ihya_tafsir=None):
+    """
+    (ref, entry) pairs in verse order, from tafsir loaded without passage
+    references or from the deduplicated ihya_tafsir.bin, which fills them in
+    """
+    if isinstance(ihya_tafsir, dict):
+        for ref, entries in ihya_tafsir.items():
+            for entry in entries:
+                yield ref, entry
+    elif os.path.exists(f"{BASE_DIR}/ihya_tafsir.bin"):
+        with tafsir_store.TafsirStore(f"{BASE_DIR}/ihya_tafsir.bin") as store:
+            for vid in range(1, len(index) + 1):
+                sura, ayah = index.ref(vid)
+                for entry in store.entries(sura, ayah):
+                    yield f"{sura}:{ayah}", entry
+
+def ihya_flags(index, refs):
+    """bytearray indexed by verse id, 1 where the verse has Ihya commentary"""
+    flags = bytearray(len(index) + 1)
+    for ref in refs:
+        flags[index.parse(ref)] = 1
+    flags[0] = 0  # refs that are not a verse
+    return flags
+
+# Each stage fills one field of every verse object from one or more sources.
+# stage -> (sources, verse field, banner)
+STAGES = {
+    "text": (("quran",), "text", "Processing Quran verses (v5)..."),
+    "translation": (("en_sahih",), "translation", "Processing Translations..."),
+    "words": (("words", "corpus"), "words", "Processing Word-by-Word data (Corpus + Words)..."),
+    "ihya": (("ihya",), "hasIhya", "Processing Ihya Tafsir with Book Titles..."),
+}
+
+# Stages that write their own files rather than a verse field.
+# stage -> (sources, banner)
+EXPORT_STAGES = {
+    "kathir": (("kathir",), "Exporting Ibn Kathir tafsir..."),
+    "topics": (("quranindex",), "Indexing topics..."),
+    "translations": (tuple(translation_sources()), "Writing translation shards..."),
+    "tajweed": (("quran", "words", "corpus"), "Annotating tajweed rules..."),
+    "navigation": (("quran",), "Writing juz / hizb / page navigation..."),
+}
+
+# Every node of the build graph, as accepted by --only
+BUILD_STAGES = ("text", "translation", "words", "ihya", "assemble", "write_json", "tafsir_store",
+                "verse_store", "shards", "search_index", "arabic_index", "kathir", "topics",
+                "translations", "tajweed", "navigation", "bitmaps")
+
+STAGE_LOADERS = {
+    "text": load_verses_text,
+    "translation": load_translations,
+    "words": load_words,
+}
+
+def stage_value(stage, data, vid):
+    """JSON value a stage contributes to the verse with global id vid"""
+    if stage == "ihya":
+        return bool(data[vid])
+    if stage == "words":
+        return data.to_json(vid)
+    return data[vid]
+
+def surah_digests(stage, data, index):
+    """Per-surah digest of the values a stage contributes to the verse objects"""
+    digests = {}
+    for sura_num in range(1, index.surah_count + 1):
+        values = [stage_value(stage, data, vid) for vid in index.surah_range(sura_num)]
+        digests[str(sura_num)] = build_cache.value_digest(values)
+    return digests
+
+def write_json(name, data):
+    with open(f"{BASE_DIR}/{name}", 'w') as f:
+        json.dump(data, f)
+
+def expected_outputs(juz_shards=False):
+    names = ["surahs.json", "verses_v4.json", "verses_v4.bin", "ihya_tafsir.json", "ihya_tafsir.bin",
+             "ihya_passages.json",
+             f"{verse_shards.SHARD_DIR}/{verse_shards.INDEX_NAME}",
+             "search.db", "arabic_index.db", f"{kathir_export.KATHIR_DIR}/{kathir_export.INDEX_NAME}",
+             "topics.json", "topic_index.bin", "verse_bitmaps.bin",
+             f"{translation_shards.TRANSLATION_DIR}/{translation_shards.INDEX_NAME}", "tajweed.json",
+             navigation.NAVIGATION_NAME, word_forms.FORMS_NAME]
+    if juz_shards:
+        names.append(verse_shards.juz_shard_name(1))
+    return names
+
+def publish_outputs(publish_dir, report):
+    """Content-addressed copies of the build's outputs in publish_dir"""
+    print(f"Publishing content-addressed outputs to {publish_dir}...")
+    outputs = build_cache.load_manifest(BASE_DIR).get('outputs', {})
+    with report.stage("publish") as record:
+        build_id, copied = content_store.publish(BASE_DIR, outputs, publish_dir)
+        record.rows = copied
+    report.info.update(build_id=build_id)
+    if copied:
+        print(f"  build {build_id}: {copied} new of {len(outputs)} files")
+    else:
+        print(f"  build {build_id} already published")
+
+def process_data(force=False, juz_shards=False, ihya_jobs=1, ihya_stream=False,
+                 report_path=None, profile_dir=None, publish_dir=None, jobs=1, only=None,
+                 trace_memory=False, previous_dir=None):
+    if profile_dir and jobs > 1:
+        print("Profiling runs the stages one at a time (--jobs 1)")
+        jobs = 1
+    report = BuildReport(trace_memory=trace_memory, profile_dir=profile_dir)
+    try:
+        build(force, juz_shards, ihya_jobs, ihya_stream, report, jobs, only, previous_dir)
+        if publish_dir:
+            publish_outputs(publish_dir, report)
+    finally:
+        close_source_catalog()
+        report.close()
+    if report_path:
+        report.write(report_path)
+        print(report.summary())
+        print(f"Build report written to {report_path}")
+    return report
+
+def stage_rows(stage, data):
+    if stage == "words":
+        return len(data)
+    return len(data) - 1  # lists indexed by verse id
+
+def build(force, juz_shards, ihya_jobs, ihya_stream, report, jobs=1, only=None, previous_dir=None):
+    os.makedirs(BASE_DIR, exist_ok=True)
+    # The build search.db and the tafsir dictionary start from, so a delta
+    # package against it only carries what changed: the --delta base, or the
+    # outputs already in BASE_DIR unless rebuilding from scratch
+    previous_dir = previous_dir or (None if force else BASE_DIR)
+    manifest = build_cache.load_manifest(BASE_DIR)
+    sources = {name: build_cache.file_digest(path) for name, path in source_paths().items()}
+    stage_sources = {stage: spec[0] for stage, spec in {**STAGES, **EXPORT_STAGES}.items()}
+
+    # --only rebuilds the named stages and their dependencies from scratch
+    incremental = (not force and not only
+                   and all(name in manifest.get('outputs', {}) for name in expected_outputs(juz_shards))
+                   and build_cache.outputs_intact(BASE_DIR, manifest))
+    stale = build_cache.stale_stages(stage_sources, sources, manifest) if incremental else list(stage_sources)
+    if not stale:
+        print("Sources unchanged since last build, nothing to do.")
+        return
+
+    if incremental:
+        with open(f"{BASE_DIR}/surahs.json", 'r') as f:
+            surahs = json.load(f)
+        if "text" in stale:
+            # A change in verse counts reshapes every surah; start from scratch
+            fresh = get_surahs()
+            if [s['verses'] for s in fresh] != [s['verses'] for s in surahs]:
+                incremental = False
+                stale = list(stage_sources)
+            surahs = fresh
+    else:
+        surahs = get_surahs()
+    index = VerseIndex.from_surahs(surahs)
+    paths = source_paths()
+
+    stage_data = {}
+    previous_digests = manifest.get('stages', {}) if incremental else {}
+    digests = dict(previous_digests)
+    dirty = set()
+    verse_stages = [stage for stage in stale if stage in STAGES]
+    outputs = dict(manifest.get('outputs', {})) if incremental or only else {}
+    outputs_lock = threading.Lock()
+    ihya_tafsir = passages = None
+    tafsir_writer, ihya_books = None, {}
+    combined_verses = None
+
+    def record_outputs(names, replace=None):
+        """Hash written outputs into the manifest, dropping older ones under the prefix replace"""
+        hashed = {name: build_cache.file_digest(f"{BASE_DIR}/{name}") for name in names}
+        with outputs_lock:
+            if replace:
+                for name in [name for name in outputs if name.startswith(replace)]:
+                    del outputs[name]
+            outputs.update(hashed)
+
+    def load_stage(stage):
+        def run(results):
+            print(STAGES[stage][2])
+            with report.stage(stage) as record:
+                record.read(*(paths[source] for source in STAGES[stage][0]))
+                stage_data[stage] = STAGE_LOADERS[stage](index)
+                record.rows = stage_rows(stage, stage_data[stage])
+            if stage in verse_stages:
+                digests[stage] = surah_digests(stage, stage_data[stage], index)
+        return run
+
+    def run_ihya(results):
+        nonlocal ihya_tafsir, passages, tafsir_writer
+        print(STAGES["ihya"][2])
+        with report.stage("ihya") as record:
+            record.read(paths["ihya"])
+            passages = ihya_dedup.PassageIndex()
+            record.rows = 0
+            # Verses arrive in verse order: their blocks go straight to the
+            # store's spill and the shared passages to ihya_passages.json
+            tafsir_writer = tafsir_store.TafsirWriter(
+                f"{BASE_DIR}/ihya_tafsir.bin", index,
+                tafsir_store.read_dictionary(f"{previous_dir}/ihya_tafsir.bin") if previous_dir else None)
+            passages_file = open(f"{BASE_DIR}/ihya_passages.json", 'w')
+            passages_file.write('{"passages": [')
+            shared_count = 0
+
+            def collect_block(ref, entries):
+                nonlocal shared_count
+                # Entries kept, in both modes (the stream mode keeps no dict to count)
+                record.rows += len(entries)
+                vid = index.parse(ref)
+                if vid:
+                    for entry in entries:
+                        ihya_books.setdefault(entry['book_title'], []).append(vid)
+                # Passages shared with other verses are written once, as ids
+                entries, new_passages = passages.collapse(ref, entries)
+                for passage in new_passages:
+                    passages_file.write(", " if shared_count else "")
+                    json.dump(passage, passages_file)
+                    tafsir_writer.add_passage(tafsir_store.serialize(passage))
+                    shared_count += 1
+                if vid:
+                    tafsir_writer.add(vid, tafsir_store.serialize(entries))
+                return entries
+
+            with passages_file:
+                ihya_tafsir = load_ihya_tafsir(ihya_jobs, ihya_stream, passages, collect_block)
+                passages_file.write("]}")
+            stage_data["ihya"] = ihya_flags(index, ihya_tafsir)
+            record.wrote(f"{BASE_DIR}/ihya_passages.json")
+            if ihya_stream:
+                record.wrote(f"{BASE_DIR}/ihya_tafsir.json")
+        print(f"  {passages.duplicates} near-duplicate entries collapsed, "
+              f"{len(passages)} passages ({shared_count} shared by several verses)")
+        record_outputs(["ihya_passages.json"] + (["ihya_tafsir.json"] if ihya_stream else []))
+        if "ihya" in verse_stages:
+            digests["ihya"] = surah_digests("ihya", stage_data["ihya"], index)
+
+    def run_assemble(results):
+        nonlocal combined_verses
+        for stage in verse_stages:
+            previous = previous_digests.get(stage, {})
+            dirty.update(int(s) for s, d in digests[stage].items() if previous.get(s) != d)
+        print("Building final JSONs...")
+        with report.stage("assemble") as record:
+            if incremental:
+                print(f"  {len(dirty)} surah(s) changed")
+                record.rows = 0
+                if dirty:
+                    record.read(f"{BASE_DIR}/verses_v4.json")
+                    with open(f"{BASE_DIR}/verses_v4.json", 'r') as f:
+                        combined_verses = json.load(f)
+                for sura_num in sorted(dirty):
+                    for verse in combined_verses[str(sura_num)]:
+                        vid = index.vid(sura_num, verse['ayah'])
+                        for stage in verse_stages:
+                            verse[STAGES[stage][1]] = stage_value(stage, stage_data[stage], vid)
+                        record.rows += 1
+            else:
+                combined_verses = {}
+                for sura_num in range(1, index.surah_count + 1):
+                    first = index.starts[sura_num - 1]
+                    combined_verses[str(sura_num)] = []
+                    for vid in index.surah_range(sura_num):
+                        verse = {"ayah": vid - first + 1}
+                        for stage, spec in STAGES.items():
+                            verse[spec[1]] = stage_value(stage, stage_data[stage], vid)
+                        combined_verses[str(sura_num)].append(verse)
+                record.rows = len(index)
+
+    def run_write_json(results):
+        written = []
+        if "text" in stale:
+            written.append(("surahs.json", surahs))
+        if dirty or not incremental:
+            written.append(("verses_v4.json", combined_verses))  # Overwrite v4
+        if "ihya" in stale and not ihya_stream:
+            written.append(("ihya_tafsir.json", ihya_tafsir))
+        names = [name for name, _ in written]
+        with report.stage("write_json") as record:
+            for name, data in written:
+                write_json(name, data)
+                record.wrote(f"{BASE_DIR}/{name}")
+            if "words" in stale:
+                # The form ids in the verses refer to this build's dictionary
+                form_count = word_forms.write_forms(f"{BASE_DIR}/{word_forms.FORMS_NAME}", stage_data["words"].forms)
+                record.wrote(f"{BASE_DIR}/{word_forms.FORMS_NAME}")
+                names.append(word_forms.FORMS_NAME)
+            record.rows = len(names)
+        if "words" in stale:
+            print(f"  {form_count} distinct word forms")
+        record_outputs(names)
+
+    def run_tafsir_store(results):
+        print("Writing compressed tafsir blocks...")
+        with report.stage("tafsir_store") as record:
+            record.rows, dict_size, kept = tafsir_writer.close()
+            record.wrote(f"{BASE_DIR}/ihya_tafsir.bin")
+        print(f"  {record.rows} verses, {dict_size} byte dictionary" + (" (kept from the previous build)" if kept else ""))
+        record_outputs(["ihya_tafsir.bin"])
+
+    def run_verse_store(results):
+        if not (dirty or not incremental):
+            return
+        print("Writing binary verse store...")
+        with report.stage("verse_store") as record:
+            if "words" in stage_data:
+                forms = stage_data["words"].forms
+            else:
+                record.read(f"{BASE_DIR}/{word_forms.FORMS_NAME}")
+                forms = word_forms.load_forms(f"{BASE_DIR}/{word_forms.FORMS_NAME}")
+            verse_store.write_verse_store(f"{BASE_DIR}/verses_v4.bin",
+                                          word_forms.decode_verses(forms, combined_verses), surahs)
+            record.rows = len(index)
+            record.wrote(f"{BASE_DIR}/verses_v4.bin")
+        record_outputs(["verses_v4.bin"])
+
+    def run_shards(results):
+        if not (dirty or not incremental):
+            return
+        print("Writing per-surah shards...")
+        shard_dirty = dirty if incremental else None
+        with report.stage("shards") as record:
+            shard_names = verse_shards.write_shards(BASE_DIR, combined_verses, surahs, shard_dirty, juz_shards)
+            record.rows = len(shard_names)
+            record.wrote(*(f"{BASE_DIR}/{name}" for name in shard_names))
+        record_outputs(shard_names)
+
+    def run_search_index(results):
+        print("Building search index...")
+        with report.stage("search_index") as record:
+            # The loaded tafsir refers to shared passages by id; the store fills them in
+            record.read(f"{BASE_DIR}/ihya_tafsir.bin")
+            docs = search_index.build_search_index(f"{BASE_DIR}/search.db", index, stage_data["translation"],
+                                                   stage_data["words"], iter_ihya_entries(index),
+                                                   f"{previous_dir}/search.db" if previous_dir else None)
+            record.rows = docs
+            record.wrote(f"{BASE_DIR}/search.db")
+        print(f"  Indexed {docs} documents")
+        record_outputs(["search.db"])
+
+    def run_arabic_index(results):
+        print("Building normalized Arabic index...")
+        with report.stage("arabic_index") as record:
+            record.read(paths["corpus"])
+            arabic_forms, segment_forms = arabic_index.build_arabic_index(
+                f"{BASE_DIR}/arabic_index.db", index, iter_corpus_rows())
+            record.rows = arabic_forms + segment_forms
+            record.wrote(f"{BASE_DIR}/arabic_index.db")
+        print(f"  {arabic_forms} word forms, {segment_forms} segment forms")
+        record_outputs(["arabic_index.db"])
+
+    def run_kathir(results):
+        print(EXPORT_STAGES["kathir"][1])
+        with report.stage("kathir") as record:
+            record.read(paths["kathir"])
+            record.rows, kathir_files = kathir_export.export_kathir(BASE_DIR, index, iter_kathir_rows())
+            record.wrote(*(f"{BASE_DIR}/{name}" for name in kathir_files))
+        print(f"  {record.rows} entries in {(len(kathir_files) - 1) // 2} surahs")
+        record_outputs(kathir_files, replace=f"{kathir_export.KATHIR_DIR}/")
+
+    def run_topics(results):
+        print(EXPORT_STAGES["topics"][1])
+        with report.stage("topics") as record:
+            record.read(paths["quranindex"])
+            topic_count, record.rows, invalid = topic_index.build_topic_index(
+                f"{BASE_DIR}/topics.json", f"{BASE_DIR}/topic_index.bin", index, iter_topic_rows())
+            record.wrote(f"{BASE_DIR}/topics.json", f"{BASE_DIR}/topic_index.bin")
+        print(f"  {topic_count} topics, {record.rows} verse references")
+        for topic, token in invalid:
+            print(f"  skipped invalid reference {token!r} in topic {topic!r}")
+        record_outputs(["topics.json", "topic_index.bin"])
+
+    def run_translations(results):
+        print(EXPORT_STAGES["translations"][1])
+        with report.stage("translations") as record:
+            # en_sahih is the base translation the "translation" stage loaded
+            translations = load_translation_sources(index, {"en_sahih": stage_data["translation"]})
+            record.read(*(translation_sources()[name][0] for name in translations if name != "en_sahih"))
+            shard_files = translation_shards.write_translation_shards(BASE_DIR, translations)
+            record.rows = len(translations) * len(index)
+            record.wrote(*(f"{BASE_DIR}/{name}" for name in shard_files))
+        print(f"  {', '.join(f'{name} ({language})' for name, (language, _) in sorted(translations.items()))}")
+        record_outputs(shard_files, replace=f"{translation_shards.TRANSLATION_DIR}/")
+
+    def run_tajweed(results):
+        print(EXPORT_STAGES["tajweed"][1])
+        with report.stage("tajweed") as record:
+            record.rows, mismatched = tajweed.write_tajweed(f"{BASE_DIR}/tajweed.json", stage_data["text"],
+                                                            stage_data["words"])
+            record.wrote(f"{BASE_DIR}/tajweed.json")
+        print(f"  {record.rows} rule spans")
+        for vid in mismatched:
+            print(f"  {index.key(vid)}: verse text words differ from corpus.db, written without spans")
+        record_outputs(["tajweed.json"])
+
+    def run_navigation(results):
+        print(EXPORT_STAGES["navigation"][1])
+        with report.stage("navigation") as record:
+            record.rows = navigation.write_navigation(f"{BASE_DIR}/{navigation.NAVIGATION_NAME}", index)
+            record.wrote(f"{BASE_DIR}/{navigation.NAVIGATION_NAME}")
+        print(f"  {record.rows} division boundaries")
+        record_outputs([navigation.NAVIGATION_NAME])
+
+    def run_bitmaps(results):
+        print("Writing verse bitmaps...")
+        with report.stage("bitmaps") as record:
+            bitmaps = {}
+            if "ihya" in stale:
+                bitmaps["ihya"] = VerseSet.from_vids(len(index), (vid for vid, flag in enumerate(stage_data["ihya"]) if flag))
+                for title, vids in ihya_books.items():
+                    bitmaps[f"ihya_book:{title}"] = VerseSet.from_vids(len(index), vids)
+            else:
+                # The Ihya sets only change with the JSONL; keep last build's
+                record.read(f"{BASE_DIR}/verse_bitmaps.bin")
+                bitmaps.update((name, bitmap) for name, bitmap in read_bitmaps(f"{BASE_DIR}/verse_bitmaps.bin").items()
+                               if name == "ihya" or name.startswith("ihya_book:"))
+            bitmaps["kathir"] = VerseSet.from_vids(len(index), kathir_vids(index))
+            for surah_type in ("Meccan", "Medinan"):
+                bitmaps[surah_type.lower()] = VerseSet.from_vids(len(index), (
+                    vid for s in surahs if s['type'] == surah_type for vid in index.surah_range(s['number'])))
+            record.read(f"{BASE_DIR}/topics.json")
+            with open(f"{BASE_DIR}/topics.json", 'r', encoding='utf-8') as f:
+                for topic in json.load(f)["topics"]:
+                    bitmaps[f"topic:{topic['id']}"] = VerseSet.from_vids(len(index), topic["verses"])
+            record.rows = write_bitmaps(f"{BASE_DIR}/verse_bitmaps.bin", len(index), bitmaps)
+            record.wrote(f"{BASE_DIR}/verse_bitmaps.bin")
+        print(f"  {record.rows} bitmaps")
+        record_outputs(["verse_bitmaps.bin"])
+
+    # The build as a graph: (stage, dependencies, runner, needed by this build)
+    ihya_deps = ["ihya"] if "ihya" in stale else []
+    graph = [
+        *((stage, [], load_stage(stage), stage in stale) for stage in ("text", "translation", "words")),
+        ("ihya", [], run_ihya, "ihya" in stale),
+        ("assemble", verse_stages, run_assemble, True),
+        ("write_json", ["assemble"], run_write_json, True),
+        ("tafsir_store", ["ihya"], run_tafsir_store, "ihya" in stale),
+        ("verse_store", ["assemble"], run_verse_store, bool(verse_stages)),
+        ("shards", ["assemble"], run_shards, bool(verse_stages)),
+        ("search_index", ["translation", "words"] + (["tafsir_store"] if ihya_deps else []), run_search_index,
+         bool({"translation", "words", "ihya"} & set(stale))),
+        ("arabic_index", [], run_arabic_index, "words" in stale),
+        ("kathir", [], run_kathir, "kathir" in stale),
+        ("topics", [], run_topics, "topics" in stale),
+        ("translations", ["translation"], run_translations, "translations" in stale),
+        ("tajweed", ["text", "words"], run_tajweed, "tajweed" in stale),
+        ("navigation", [], run_navigation, "navigation" in stale),
+        ("bitmaps", ihya_deps + (["topics"] if "topics" in stale else []), run_bitmaps, True),
+    ]
+    stages = [stage_graph.Stage(name, deps, run) for name, deps, run, _ in graph]
+    selected = stage_graph.closure(stages, only or [name for name, _, _, needed in graph if needed])
+    stages = [stage for stage in stages if stage.name in selected]
+    if only:
+        print(f"Running stages: {', '.join(stage.name for stage in stages)}")
+    else:
+        print(f"Rebuilding stages: {', '.join(stale)}" + ("" if incremental else " (full build)"))
+    report.info.update(incremental=incremental, stale=stale, jobs=jobs, stages=[stage.name for stage in stages])
+    stage_graph.run_stages(stages, jobs)
+
+    # A partial build leaves the source and stage hashes to the next full
+    # one, so the stages it skipped are still seen as stale
+    if not only:
+        manifest['sources'] = sources
+        manifest['stages'] = digests
+    manifest['outputs'] = outputs
+    build_cache.save_manifest(BASE_DIR, manifest)
     print("Done v5!")
 
+def main():
+    parser = argparse.ArgumentParser(description="Build the app's Quran / Ihya JSON assets")
+    parser.add_argument("--force", action="store_true",
+                        help="ignore the build manifest and rebuild everything")
+    parser.add_argument("--juz-shards", action="store_true",
+                        help="also write one verse shard per juz")
+    parser.add_argument("--ihya-jobs", type=int, default=1,
+                        help="worker processes for parsing the Ihya JSONL and signing its entries (default: 1)")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="threads running build stages once their inputs are ready; overlaps SQLite, "
+                             "file and zlib work only, not pure-Python stages (default: 1)")
+    parser.add_argument("--only", action="append", choices=BUILD_STAGES, metavar="STAGE",
+                        help=f"rebuild only this stage and what it depends on; repeatable. One of: {', '.join(BUILD_STAGES)}")
+    parser.add_argument("--ihya-stream", action="store_true",
+                        help="write ihya_tafsir.json while reading instead of holding it in memory")
+    parser.add_argument("--out-dir", help=f"output directory (default: {BASE_DIR})")
+    parser.add_argument("--db-dir", help=f"source database directory (default: {ALQURAN_DB_DIR})")
+    parser.add_argument("--ihya-jsonl", help=f"Ihya analysis JSONL (default: {IHYA_JSONL})")
+    parser.add_argument("--kathir-db", help="kathir.db to export (default: databases/kathir.db in the output directory)")
+    parser.add_argument("--quranindex-db",
+                        help="quranindex.db with the topic list (default: databases/quranindex.db in the output directory)")
+    parser.add_argument("--report", metavar="PATH",
+                        help="write a JSON report of per-stage time, rows and bytes")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="also record each stage's tracemalloc peak in the report; slows the build several times over")
+    parser.add_argument("--profile", metavar="DIR",
+                        help="dump cProfile stats of every stage to DIR/<stage>.prof")
+    parser.add_argument("--publish", metavar="DIR",
+                        help="copy every output to DIR under a content-hashed name, listed in DIR/assets.json")
+    parser.add_argument("--delta", nargs=2, metavar=("OLD_DIR", "PACKAGE"),
+                        help="after the build, write a delta package from the build in OLD_DIR to this one; "
+                             "the search index and tafsir dictionary are built from OLD_DIR's to keep it small")
+    args = parser.parse_args()
+    if args.profile and args.jobs > 1:
+        parser.error("--profile needs --jobs 1: only one cProfile profiler can run at a time")
+    if args.trace_memory and not args.report:
+        parser.error("--trace-memory needs --report")
+    configure_paths(args.out_dir, args.db_dir, args.ihya_jsonl, args.kathir_db, args.quranindex_db)
+    process_data(force=args.force, juz_shards=args.juz_shards,
+                 ihya_jobs=args.ihya_jobs, ihya_stream=args.ihya_stream,
+                 report_path=args.report, profile_dir=args.profile, publish_dir=args.publish,
+                 jobs=args.jobs, only=args.only, trace_memory=args.trace_memory,
+                 previous_dir=args.delta[0] if args.delta else None)
+    if args.delta:
+        old_dir, package = args.delta
+        delta = make_delta(old_dir, BASE_DIR, package)
+        print(f"Delta package {package}: {len(delta['files'])} changed files, "
+              f"{os.path.getsize(package)} bytes")
+
 if __name__ == "__main__":
-    process_data()
+    main()
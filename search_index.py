@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+SQLite FTS5 search index (search.db) over the Sahih translation, the cleaned
+word transliterations and the Ihya commentary.
+
+Every verse gets one document holding its translation and transliteration,
+and every Ihya entry gets its own document, so snippets come from the entry
+that matched. Results are grouped per verse id and ranked by BM25.
+
+A build from scratch inserts, optimizes and vacuums, so every page moves
+when one document changes. Given the search.db of the previous build, the
+index is instead updated: documents are matched by a digest of their
+content, only the ones that changed are deleted or inserted, and the pages
+holding the rest stay where they were, which keeps delta packages small.
+Updates leave FTS5 segments unmerged and free pages behind; a forced build
+(process_data_v5 --force) starts from scratch and compacts them again.
+"""
+import hashlib
+import itertools
+import json
+import os
+import shutil
+import sqlite3
+
+SCHEMA = """
+    CREATE VIRTUAL TABLE search USING fts5(
+        vid UNINDEXED, translation, translit, ihya,
+        tokenize = 'unicode61 remove_diacritics 2'
+    );
+    CREATE TABLE verse_refs (vid INTEGER PRIMARY KEY, sura INTEGER, ayah INTEGER);
+"""
+
+# bm25() weights for (vid, translation, translit, ihya)
+WEIGHTS = (0.0, 4.0, 2.0, 1.0)
+COLUMNS = ("translation", "translit", "ihya")
+# Documents fetched per requested verse before grouping by verse
+OVERFETCH = 3
+
+
+def _doc_key(doc):
+    return hashlib.blake2b(json.dumps(doc, ensure_ascii=False).encode('utf-8'), digest_size=16).digest()
+
+
+def _is_search_db(conn):
+    try:
+        conn.execute("SELECT vid, translation, translit, ihya FROM search LIMIT 0")
+        conn.execute("SELECT vid, sura, ayah FROM verse_refs LIMIT 0")
+    except sqlite3.DatabaseError:
+        return False
+    return True
+
+
+def _update(conn, index, docs):
+    """Turn the search.db open on conn into one holding exactly docs"""
+    stale = {}
+    for rowid, *doc in conn.execute("SELECT rowid, vid, translation, translit, ihya FROM search"):
+        stale.setdefault(_doc_key(doc), []).append(rowid)
+    refs = {vid: (sura, ayah) for vid, sura, ayah in conn.execute("SELECT vid, sura, ayah FROM verse_refs")}
+    with conn:
+        for vid in range(1, len(index) + 1):
+            if refs.get(vid) != index.ref(vid):
+                conn.execute("INSERT OR REPLACE INTO verse_refs VALUES (?, ?, ?)", (vid, *index.ref(vid)))
+        conn.execute("DELETE FROM verse_refs WHERE vid > ?", (len(index),))
+        for doc in docs:
+            rowids = stale.get(_doc_key(list(doc)))
+            if rowids:
+                rowids.pop()
+            else:
+                conn.execute("INSERT INTO search (vid, translation, translit, ihya) VALUES (?, ?, ?, ?)", doc)
+        conn.executemany("DELETE FROM search WHERE rowid = ?",
+                         ((rowid,) for rowids in stale.values() for rowid in rowids))
+
+
+def build_search_index(path, index, translations, words, ihya_entries, base=None):
+    """
+    Write search.db.
+
+    translations is a list indexed by verse id, words a WordTable and
+    ihya_entries an iterable of (ref, entry) pairs as parsed from the JSONL.
+    base, if given, is the search.db of an earlier build to update rather
+    than building from scratch. Returns the number of documents indexed.
+    """
+    tmp_path = path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    def verse_docs():
+        for vid in range(1, len(index) + 1):
+            translit = " ".join(words.translit[i] for i in words.rows(vid))
+            yield vid, translations[vid] or "", translit, ""
+
+    def ihya_docs():
+        for ref, entry in ihya_entries:
+            vid = index.parse(ref)
+            if vid and entry.get('english'):
+                yield vid, "", "", entry['english']
+
+    conn = None
+    if base and os.path.exists(base):
+        shutil.copyfile(base, tmp_path)
+        conn = sqlite3.connect(tmp_path)
+        if not _is_search_db(conn):
+            conn.close()
+            os.remove(tmp_path)
+            conn = None
+    if conn is not None:
+        _update(conn, index, itertools.chain(verse_docs(), ihya_docs()))
+        count = conn.execute("SELECT COUNT(*) FROM search").fetchone()[0]
+    else:
+        conn = sqlite3.connect(tmp_path)
+        conn.executescript(SCHEMA)
+        with conn:
+            conn.executemany("INSERT INTO verse_refs VALUES (?, ?, ?)",
+                             ((vid, *index.ref(vid)) for vid in range(1, len(index) + 1)))
+            conn.executemany("INSERT INTO search (vid, translation, translit, ihya) VALUES (?, ?, ?, ?)", verse_docs())
+            conn.executemany("INSERT INTO search (vid, translation, translit, ihya) VALUES (?, ?, ?, ?)", ihya_docs())
+            conn.execute("INSERT INTO search (search) VALUES ('optimize')")
+        count = conn.execute("SELECT COUNT(*) FROM search").fetchone()[0]
+        conn.execute("VACUUM")
+    conn.close()
+    os.replace(tmp_path, path)
+    return count
+
+
+def match_expression(query, prefix=False):
+    """FTS5 MATCH string for free text: every term quoted, all required"""
+    terms = ['"' + term.replace('"', '""') + '"' for term in query.split()]
+    if prefix and terms:
+        terms[-1] += "*"
+    return " ".join(terms)
+
+
+class SearchIndex:
+    """Read-only query API over search.db"""
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def search(self, query, limit=20, column=None, prefix=False, snippet_tokens=12):
+        """
+        Best matching verses for free-text query, most relevant first.
+
+        column restricts matching to one of COLUMNS; prefix treats the last
+        term as a prefix (as-you-type). Each result is a dict with vid, sura,
+        ayah, score (BM25, lower is better) and snippet, where matched terms
+        are wrapped in [ ].
+        """
+        expression = match_expression(query, prefix)
+        if not expression:
+            return []
+        if column:
+            if column not in COLUMNS:
+                raise ValueError(f"unknown column {column!r}")
+            expression = f"{column} : ({expression})"
+        # Several Ihya documents can match for one verse; keep the best.
+        # Over-fetch so duplicates rarely leave fewer than limit verses, and
+        # only fetch more when they do
+        fetch = limit * OVERFETCH
+        while True:
+            rows = self.conn.execute(
+                f"""
+                SELECT vid, bm25(search, {', '.join(map(str, WEIGHTS))}) AS score,
+                       snippet(search, -1, '[', ']', '…', ?)
+                FROM search WHERE search MATCH ? ORDER BY score LIMIT ?
+                """,
+                (snippet_tokens, expression, fetch),
+            ).fetchall()
+            best = {}
+            for vid, score, snippet in rows:
+                if vid not in best:
+                    best[vid] = (score, snippet)
+            if len(best) >= limit or len(rows) < fetch:
+                break
+            fetch *= 4
+        results = []
+        for vid, (score, snippet) in list(best.items())[:limit]:
+            sura, ayah = self.conn.execute("SELECT sura, ayah FROM verse_refs WHERE vid = ?", (vid,)).fetchone()
+            results.append({"vid": vid, "sura": sura, "ayah": ayah, "score": score, "snippet": snippet})
+        return results
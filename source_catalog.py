@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Shared read-only access to the source databases.
+
+Connections are opened once per source (and per thread) as read-only URI
+connections with read-tuned pragmas, and reused by every stage. Verse
+databases are FTS3/FTS4 tables whose rows live in the verses_content
+shadow table; reading that by docid avoids the virtual-table scan and the
+ORDER BY sort of querying `verses` itself.
+"""
+import sqlite3
+import threading
+from urllib.parse import quote
+
+PRAGMAS = (
+    ("query_only", 1),
+    ("mmap_size", 256 * 1024 * 1024),
+    ("cache_size", -16 * 1024),  # KiB
+    ("temp_store", "MEMORY"),
+)
+
+
+def readonly_uri(path):
+    return f"file:{quote(path)}?mode=ro"
+
+
+class SourceCatalog:
+    """Pooled read-only connections to named source databases"""
+
+    def __init__(self, paths):
+        self.paths = dict(paths)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._all = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def connect(self, name):
+        """The calling thread's connection to source `name`"""
+        conns = getattr(self._local, "conns", None)
+        if conns is None:
+            conns = self._local.conns = {}
+        conn = conns.get(name)
+        if conn is None:
+            conn = sqlite3.connect(readonly_uri(self.paths[name]), uri=True, check_same_thread=False)
+            for pragma, value in PRAGMAS:
+                conn.execute(f"PRAGMA {pragma} = {value}")
+            conns[name] = conn
+            with self._lock:
+                self._all.append(conn)
+        return conn
+
+    def attach(self, name, other, alias):
+        """connect(name) with source `other` attached as `alias`"""
+        conn = self.connect(name)
+        attached = {row[1] for row in conn.execute("PRAGMA database_list")}
+        if alias not in attached:
+            conn.execute("ATTACH DATABASE ? AS " + alias, (readonly_uri(self.paths[other]),))
+        return conn
+
+    def has_table(self, name, table):
+        return self.connect(name).execute(
+            "SELECT 1 FROM sqlite_master WHERE name = ?", (table,)
+        ).fetchone() is not None
+
+    def shadow_columns(self, name, table="verses"):
+        """{column: content column} of an FTS3/4 table, or None if there is no shadow table"""
+        if not self.has_table(name, f"{table}_content"):
+            return None
+        # FTS3/4 store column <name> as c<i><name> next to the docid
+        columns = self.connect(name).execute(f"PRAGMA table_info({table}_content)")
+        return {c[1][1:].lstrip("0123456789"): c[1] for c in columns if c[1] != "docid"}
+
+    def verse_rows(self, name, column="text", table="verses"):
+        """(sura, ayah, column) for every verse of a quran.db-style source, in verse order"""
+        conn = self.connect(name)
+        shadow = self.shadow_columns(name, table)
+        if shadow:
+            return conn.execute(
+                f'SELECT "{shadow["sura"]}", "{shadow["ayah"]}", "{shadow[column]}" '
+                f'FROM "{table}_content" ORDER BY docid')
+        return conn.execute(f'SELECT sura, ayah, "{column}" FROM "{table}" ORDER BY sura, ayah')
+
+    def surah_counts(self, name="quran"):
+        """{sura: number of verses} with a single aggregate"""
+        conn = self.connect(name)
+        shadow = self.shadow_columns(name)
+        if shadow:
+            return dict(conn.execute(
+                f'SELECT "{shadow["sura"]}", COUNT(*) FROM verses_content GROUP BY 1'))
+        return dict(conn.execute("SELECT sura, COUNT(*) FROM verses GROUP BY sura"))
+
+    def close(self):
+        with self._lock:
+            for conn in self._all:
+                conn.close()
+            self._all = []
+        self._local = threading.local()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Dependency-ordered execution of build stages.
+
+A Stage names the stages whose results it needs. run_stages() starts every
+stage as soon as its dependencies have finished, on a pool of `jobs`
+threads. The stages share the verse index and each other's in-memory
+results, so they are threads rather than processes, and only the work that
+releases the GIL overlaps: SQLite queries, file I/O and zlib. Pure-Python
+work (JSON assembly, tajweed annotation, MinHash, bitmap building) holds
+the GIL and runs no faster with more jobs; the Ihya parsing has its own
+process pool for that (--ihya-jobs). With jobs=1 the stages run one after
+another in declaration order, exactly as a plain script.
+"""
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+class Stage:
+    """One node of the build graph: run(results) -> result"""
+    __slots__ = ("name", "deps", "run")
+
+    def __init__(self, name, deps, run):
+        self.name = name
+        self.deps = tuple(deps)
+        self.run = run
+
+    def __repr__(self):
+        return f"Stage({self.name!r}, {list(self.deps)})"
+
+
+def closure(stages, names):
+    """names and every stage they depend on, transitively"""
+    by_name = {stage.name: stage for stage in stages}
+    selected, todo = set(), list(names)
+    while todo:
+        name = todo.pop()
+        if name in selected:
+            continue
+        if name not in by_name:
+            raise KeyError(f"unknown stage {name!r}")
+        selected.add(name)
+        todo.extend(by_name[name].deps)
+    return selected
+
+
+def check_graph(stages):
+    """Raise ValueError on duplicate names, unknown dependencies or cycles"""
+    names = [stage.name for stage in stages]
+    if len(set(names)) != len(names):
+        raise ValueError("duplicate stage names")
+    deps = {stage.name: set(stage.deps) for stage in stages}
+    for name, needs in deps.items():
+        if needs - deps.keys():
+            raise ValueError(f"stage {name!r} depends on unknown {sorted(needs - deps.keys())}")
+    done = set()
+    while len(done) < len(deps):
+        ready = [name for name, needs in deps.items() if name not in done and needs <= done]
+        if not ready:
+            raise ValueError(f"dependency cycle among {sorted(deps.keys() - done)}")
+        done.update(ready)
+
+
+def run_stages(stages, jobs=1):
+    """
+    Run stages and return {name: result}. Ready stages start in the order
+    they are listed. The first exception raised by a stage is re-raised once
+    the stages already running have finished; nothing new is started after it.
+    """
+    check_graph(stages)
+    results = {}
+    if jobs <= 1:
+        pending = list(stages)
+        while pending:
+            stage = next(s for s in pending if all(dep in results for dep in s.deps))
+            pending.remove(stage)
+            results[stage.name] = stage.run(results)
+        return results
+
+    pending = list(stages)
+    running = {}
+    error = None
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        while pending or running:
+            if error is None:
+                for stage in [s for s in pending if all(dep in results for dep in s.deps)]:
+                    pending.remove(stage)
+                    running[pool.submit(stage.run, results)] = stage
+            if not running:
+                break
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                stage = running.pop(future)
+                try:
+                    results[stage.name] = future.result()
+                except BaseException as e:
+                    error = error or e
+    if error is not None:
+        raise error
+    return results
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Compressed per-verse Ihya tafsir (ihya_tafsir.bin) and its lazy reader.
+
+Every verse's list of tafsir records is serialized as compact JSON and
+deflated on its own, with a preset dictionary trained on the corpus, so a
+single verse can be inflated without touching the others while still
+compressing close to the whole file. Passages quoted under several verses
+(see ihya_dedup) are stored once as blocks of their own; a verse lists them
+as {"passage": id} and the reader substitutes the passage record.
+
+TafsirWriter takes the blocks as the ingestion produces them: they are
+spilled to a temporary file and only an evenly spaced sample is kept in
+memory to train the dictionary on. Every block is deflated against the
+dictionary, so a new dictionary changes every block. Given the previous
+build's dictionary, the writer keeps it while it still compresses the
+sample within DICT_SLACK of a freshly trained one; unchanged verses then
+come out byte for byte the same and delta packages stay small.
+
+Layout (little-endian):
+    header        magic, version, surah count, verse count, passage count,
+                  section offsets
+    surah table   (surahs + 1) x u32 verse id of each surah's first verse
+    block table   (verses + 1) x u32 offset of each verse's block in the data
+                  section; a verse without tafsir has an empty block
+    passage table (passages + 1) x u32 offset of each passage's block
+    dictionary    zlib preset dictionary (at most 32 KiB)
+    data          raw deflate blocks, verses in verse id order, then passages
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import zlib
+from array import array
+from collections import Counter
+
+MAGIC = b"QTFZ"
+VERSION = 2
+
+HEADER = struct.Struct("<4sHHIIIIIIII")
+U32 = struct.Struct("<I")
+
+DICT_SIZE = 32 * 1024            # deflate window; a larger dictionary is not used
+TRAIN_BYTES = 1 << 20           # sample size the dictionary is trained on
+DICT_SLACK = 0.02                # extra sample bytes accepted to keep the previous dictionary
+LEVEL = 9
+WBITS = -15                      # raw deflate, no per-block zlib header / checksum
+
+
+def serialize(records):
+    return json.dumps(records, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def train_dictionary(blocks, size=DICT_SIZE, sample_bytes=TRAIN_BYTES):
+    """
+    Preset dictionary from the byte strings that repeat most across blocks.
+
+    Word 1- to 4-grams of an evenly spaced sample are scored by the bytes
+    they would save (occurrences x length). The best are packed most
+    valuable last, since deflate codes nearer matches more cheaply.
+    """
+    if not blocks:
+        return b""
+    total = sum(len(block) for block in blocks)
+    step = max(1, total // sample_bytes)
+    counts = Counter()
+    for block in blocks[::step]:
+        tokens = block.split(b" ")
+        seen = set()
+        for n in range(1, 5):
+            for i in range(len(tokens) - n + 1):
+                gram = b" ".join(tokens[i:i + n])
+                if len(gram) > 3 and gram not in seen:
+                    seen.add(gram)
+        counts.update(seen)  # document frequency: one count per sampled block
+    scored = sorted(((c - 1) * len(g), g) for g, c in counts.items() if c > 1)
+    chosen, used = [], 0
+    for _, gram in reversed(scored):
+        if used + len(gram) + 1 > size:
+            continue
+        if any(gram in picked for picked in chosen[-256:]):
+            continue
+        chosen.append(gram)
+        used += len(gram) + 1
+    return b" ".join(reversed(chosen))
+
+
+def _deflated_size(blocks, zdict):
+    size = 0
+    for block in blocks:
+        compressor = zlib.compressobj(LEVEL, zlib.DEFLATED, WBITS, zdict=zdict)
+        size += len(compressor.compress(block)) + len(compressor.flush())
+    return size
+
+
+def read_dictionary(path):
+    """Preset dictionary of an existing store, or None if there is no readable one"""
+    try:
+        with TafsirStore(path) as store:
+            return bytes(store._zdict)
+    except (OSError, ValueError, struct.error):
+        return None
+
+
+class TafsirWriter:
+    """
+    Writes ihya_tafsir.bin from blocks added in increasing verse id order.
+    Blocks are spilled to disk as they come; close() trains the dictionary
+    on the sample, or keeps previous_dictionary if that is still as good,
+    and compresses the spill into the store.
+    """
+
+    def __init__(self, path, index, previous_dictionary=None):
+        self.path = path
+        self.index = index
+        self.previous_dictionary = previous_dictionary
+        self._spill = tempfile.TemporaryFile(prefix="tafsir_spill_")
+        self._passage_spill = tempfile.TemporaryFile(prefix="tafsir_spill_")
+        self._blocks = array('I', [0])          # spill offsets of the verses with tafsir
+        self._block_vids = array('I')
+        self._passages = array('I', [0])        # passage spill offsets
+        self._sample, self._sample_bytes = [], 0
+        self._step, self._seen = 1, 0
+
+    def _keep_sample(self, block):
+        # Every step-th block; when the sample grows past twice TRAIN_BYTES
+        # every other one is dropped and the step doubles, so it stays
+        # evenly spaced over everything added
+        if self._seen % self._step == 0:
+            self._sample.append(block)
+            self._sample_bytes += len(block)
+            if self._sample_bytes > 2 * TRAIN_BYTES:
+                self._sample = self._sample[::2]
+                self._sample_bytes = sum(len(b) for b in self._sample)
+                self._step *= 2
+        self._seen += 1
+
+    def add(self, vid, block):
+        """serialize()d records of verse id vid"""
+        if self._block_vids and vid <= self._block_vids[-1]:
+            raise ValueError(f"verse {vid} added after verse {self._block_vids[-1]}")
+        self._spill.write(block)
+        self._blocks.append(self._blocks[-1] + len(block))
+        self._block_vids.append(vid)
+        self._keep_sample(block)
+
+    def add_passage(self, block):
+        """serialize()d record of the next shared passage id"""
+        self._passage_spill.write(block)
+        self._passages.append(self._passages[-1] + len(block))
+        self._keep_sample(block)
+
+    def close(self):
+        """Write the store; returns (verses with tafsir, dictionary size, previous dictionary kept)"""
+        zdict = train_dictionary(self._sample)
+        kept = bool(self.previous_dictionary) and (
+            _deflated_size(self._sample, self.previous_dictionary)
+            <= _deflated_size(self._sample, zdict) * (1 + DICT_SLACK))
+        if kept:
+            zdict = self.previous_dictionary
+        self._sample = []
+        index = self.index
+        surah_table_off = HEADER.size
+        block_table_off = surah_table_off + U32.size * (index.surah_count + 1)
+        passage_table_off = block_table_off + U32.size * (len(index) + 1)
+        dict_off = passage_table_off + U32.size * len(self._passages)
+        data_off = dict_off + len(zdict)
+
+        offsets = array('I', [0]) * (len(index) + 1)
+        passage_offsets = array('I')
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.seek(data_off)
+            written = 0
+
+            def deflate(spill, start, end):
+                nonlocal written
+                spill.seek(start)
+                compressor = zlib.compressobj(LEVEL, zlib.DEFLATED, WBITS, zdict=zdict)
+                data = compressor.compress(spill.read(end - start)) + compressor.flush()
+                f.write(data)
+                written += len(data)
+
+            # offsets[vid] is the end of verse vid's block; a verse without
+            # tafsir ends where the previous one did
+            block = 0
+            for vid in range(1, len(index) + 1):
+                if block < len(self._block_vids) and self._block_vids[block] == vid:
+                    deflate(self._spill, self._blocks[block], self._blocks[block + 1])
+                    block += 1
+                offsets[vid] = written
+            passage_offsets.append(written)
+            for i in range(len(self._passages) - 1):
+                deflate(self._passage_spill, self._passages[i], self._passages[i + 1])
+                passage_offsets.append(written)
+
+            f.seek(0)
+            f.write(HEADER.pack(MAGIC, VERSION, index.surah_count, len(index), len(passage_offsets) - 1,
+                                surah_table_off, block_table_off, passage_table_off, dict_off, len(zdict), data_off))
+            f.write(struct.pack(f"<{len(index.starts)}I", *index.starts))
+            f.write(struct.pack(f"<{len(offsets)}I", *offsets))
+            f.write(struct.pack(f"<{len(passage_offsets)}I", *passage_offsets))
+            f.write(zdict)
+        os.replace(tmp_path, self.path)
+        self._spill.close()
+        self._passage_spill.close()
+        return len(self._block_vids), len(zdict), kept
+
+
+class TafsirStore:
+    """Inflates one verse's tafsir at a time from ihya_tafsir.bin"""
+
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, self.surah_count, self.verse_count, self.passage_count, self._surah_table,
+         self._block_table, self._passage_table, dict_off, dict_size, self._data) = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a version {VERSION} tafsir store")
+        self._zdict = self._mm[dict_off:dict_off + dict_size]
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def vid(self, sura, ayah):
+        """Verse id of sura:ayah, or 0 if there is no such verse"""
+        if not 1 <= sura <= self.surah_count:
+            return 0
+        start, end = struct.unpack_from("<II", self._mm, self._surah_table + (sura - 1) * U32.size)
+        return start + ayah - 1 if 1 <= ayah <= end - start else 0
+
+    def _inflate(self, table, i):
+        start, end = struct.unpack_from("<II", self._mm, table + i * U32.size)
+        if start == end:
+            return []
+        inflater = zlib.decompressobj(WBITS, zdict=self._zdict)
+        return json.loads(inflater.decompress(self._mm[self._data + start:self._data + end]) + inflater.flush())
+
+    def block(self, vid):
+        """Compressed block of verse id vid"""
+        start, end = struct.unpack_from("<II", self._mm, self._block_table + (vid - 1) * U32.size)
+        return self._mm[self._data + start:self._data + end]
+
+    def passage(self, passage_id):
+        """Record of a shared passage"""
+        if not 0 <= passage_id < self.passage_count:
+            raise KeyError(passage_id)
+        return self._inflate(self._passage_table, passage_id)
+
+    def entries(self, sura, ayah):
+        """Tafsir records of sura:ayah with shared passages filled in, [] if it has none"""
+        vid = self.vid(sura, ayah)
+        if not vid:
+            raise KeyError(f"{sura}:{ayah}")
+        return [self.passage(entry["passage"]) if "passage" in entry else entry
+                for entry in self._inflate(self._block_table, vid - 1)]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print(f"usage: {sys.argv[0]} ihya_tafsir.bin SURA:AYAH")
+        sys.exit(1)
+    sura, ayah = (int(x) for x in sys.argv[2].split(':'))
+    with TafsirStore(sys.argv[1]) as store:
+        print(json.dumps(store.entries(sura, ayah), ensure_ascii=False, indent=2))
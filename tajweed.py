@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Tajweed rule spans of the Uthmani verse text (quran.db), computed at build
+time so the app only has to colour them.
+
+The text is cut into letter clusters (a letter and the marks that follow
+it). A cluster gets at most one rule:
+    madd        letter carrying a maddah (U+0653) or a superscript alef
+                (U+0670), and alef with madda above (آ); a noon or meem
+                with shadda and a superscript alef stays ghunna
+    ghunna      noon or meem with shadda
+    idgham      noon sakinah / tanween before ي ن م و in the next word,
+                meem sakinah before meem
+    idghamWo    noon sakinah / tanween before ل ر
+    ikhfa       noon sakinah / tanween before the 15 ikhfa letters,
+                meem sakinah before ba
+    iqlab       noon sakinah / tanween before ba
+    qalqala     ق ط ب ج د with sukun, or closing the verse (stopping),
+                except before the alef carrying its fath tanween, which
+                is read as a long ā when stopping
+In this script a noon or meem without a vowel is sakin: the sukun is only
+written where the letter is pronounced clearly. Silent letters (small
+rounded / rectangular zero) and the alef or alef maksura carrying a fath
+tanween are skipped when looking for the next letter. Noon inside one
+word before ya or waw stays clear (دنيا, قنوان), as do the spelled-out
+letters at surah openings (نٓ, الٓمٓ), which carry a maddah.
+
+tajweed.json holds the rule names and, per verse id ([0] unused), a list
+of [start, length, rule] spans per corpus.db word, in text order.
+The app colours the word-by-word Arabic, so spans are cut at the words of
+the verse text and only kept when those are the corpus words; starts count
+characters of the word. All of the text is in the BMP, so they equal
+JavaScript string indices.
+"""
+import json
+import re
+import sys
+
+RULES = ("ghunna", "idgham", "idghamWo", "ikhfa", "iqlab", "qalqala", "madd")
+RULE_IDS = {rule: i for i, rule in enumerate(RULES)}
+
+SUKUN = "ْ"
+SHADDA = "ّ"
+MADDAH = "ٓ"
+SUPERSCRIPT_ALEF = "ٰ"
+ALEF_MADDA = "آ"
+TANWEEN = set("ًٌٍ")
+VOWELS = set("ًٌٍَُِ") | {SHADDA}
+SILENT = set("۟۠")             # small high rounded / rectangular zero
+IQLAB_MARKS = set("ۭۢ")        # small meem written over / under the noon
+
+NOON, MEEM, BA = "ن", "م", "ب"
+IDGHAM_GHUNNA = set("ينمو")
+IDGHAM_NO_GHUNNA = set("لر")
+IKHFA = set("تثجدذزسشصضطظفقك")
+QALQALA = set("قطبجد")
+TANWEEN_CARRIERS = set("اى")   # alef / alef maksura after a fath tanween
+
+
+def _is_mark(ch):
+    return "ً" <= ch <= "ٟ" or ch == "ٰ" or "ۖ" <= ch <= "ۭ" or ch == "ـ"
+
+
+def clusters(text):
+    """(start, end, letter, marks, word) of every letter in text"""
+    result, word, i = [], 0, 0
+    while i < len(text):
+        ch = text[i]
+        if ch.isspace():
+            if result and result[-1][4] == word:
+                word += 1
+            i += 1
+            continue
+        start = i
+        i += 1
+        while i < len(text) and _is_mark(text[i]):
+            i += 1
+        result.append((start, i, ch, text[start + 1:i], word))
+    return result
+
+
+def _next_letter(cells, i):
+    """Index of the next pronounced cluster after i, or None"""
+    tanween = bool(TANWEEN & set(cells[i][3]))
+    j = i + 1
+    while j < len(cells):
+        _, _, letter, marks, _ = cells[j]
+        if SILENT & set(marks) or (tanween and letter in TANWEEN_CARRIERS and not VOWELS & set(marks)):
+            j += 1
+            continue
+        return j
+    return None
+
+
+def _rule(cells, i):
+    _, _, letter, marks, word = cells[i]
+    mark_set = set(marks)
+    if MADDAH in mark_set:
+        return "madd"
+    if letter in (NOON, MEEM) and SHADDA in mark_set:
+        return "ghunna"
+    if SUPERSCRIPT_ALEF in mark_set or letter == ALEF_MADDA:
+        return "madd"
+    sakin = not VOWELS & mark_set and not SILENT & mark_set
+    nxt = _next_letter(cells, i)
+    target = cells[nxt][2] if nxt is not None else None
+    if target and ((letter == NOON and sakin) or TANWEEN & mark_set):
+        if target == BA or IQLAB_MARKS & mark_set:
+            return "iqlab"
+        if target in IDGHAM_GHUNNA:
+            if letter == NOON and cells[nxt][4] == word and target in "يو":
+                return None
+            return "idgham"
+        if target in IDGHAM_NO_GHUNNA:
+            return "idghamWo"
+        if target in IKHFA:
+            return "ikhfa"
+        return None
+    if target and letter == MEEM and sakin:
+        if target == MEEM:
+            return "idgham"
+        if target == BA:
+            return "ikhfa"
+        return None
+    # A tanween letter whose skipped carrier closes the verse is stopped on
+    # with ā, not with a sukun
+    final = nxt is None and not (TANWEEN & mark_set and
+                                 any(cell[2] in TANWEEN_CARRIERS for cell in cells[i + 1:]))
+    if letter in QALQALA and (SUKUN in mark_set or final):
+        return "qalqala"
+    return None
+
+
+def annotate(text):
+    """[(start, length, rule)] of one verse, in text order"""
+    cells = clusters(text or "")
+    spans = []
+    for i, (start, end, _, _, _) in enumerate(cells):
+        rule = _rule(cells, i)
+        if rule:
+            spans.append((start, end - start, rule))
+    return spans
+
+
+def word_spans(text, words):
+    """
+    [[start, length, rule id], ...] per word of a verse, with starts relative
+    to the word, or None if text does not split into exactly words
+    """
+    tokens = list(re.finditer(r"\S+", text or ""))
+    if [m.group() for m in tokens] != list(words):
+        return None
+    per_word = [[] for _ in tokens]
+    w = 0
+    for start, length, rule in annotate(text):
+        while start >= tokens[w].end():
+            w += 1
+        per_word[w].append([start - tokens[w].start(), length, RULE_IDS[rule]])
+    return per_word
+
+
+def write_tajweed(path, texts, words):
+    """
+    Write tajweed.json from verse texts indexed by verse id and the corpus
+    words (a verse_index.WordTable). Returns (span count, verses whose text
+    words differ from the corpus words, written without spans).
+    """
+    verses, count, mismatched = [None], 0, []
+    for vid in range(1, len(texts)):
+        spans = word_spans(texts[vid], [words.arabic[i] for i in words.rows(vid)])
+        if spans is None:
+            mismatched.append(vid)
+            spans = [[] for _ in words.rows(vid)]
+        verses.append(spans)
+        count += sum(len(word) for word in spans)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({"rules": RULES, "verses": verses}, f, separators=(',', ':'))
+    return count, mismatched
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print(f"usage: {sys.argv[0]} 'VERSE TEXT'")
+        sys.exit(1)
+    verse = sys.argv[1]
+    for start, length, rule in annotate(verse):
+        print(f"{start:4} {length:2}  {rule:<9} {verse[start:start + length]}")
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Topic index from quranindex.db (quranindex).
+
+The free-text `Verses` column ("7:65, 7:74, 9:70, ...") of every topic is
+parsed once and checked against the verse counts, giving topics.json for
+browsing and topic_index.bin with both directions as CSR arrays:
+
+    header          magic, version, topic count, verse count, posting counts
+    topic offsets   (topics + 1) x u32 into the verse postings
+    verse postings  u32 verse ids, sorted per topic
+    verse offsets   (verses + 2) x u32 into the topic postings (vid 0 unused)
+    topic postings  u32 topic ids, sorted per verse
+
+Topic ids are the 0-based position in topics.json. Both lookups are a
+slice between two offsets.
+"""
+import json
+import re
+import struct
+import sys
+from array import array
+
+MAGIC = b"QTPX"
+VERSION = 2
+HEADER = struct.Struct("<4sHHIII")
+
+_REF = re.compile(r"^(\d+):(\d+)(?:\s*-\s*(\d+))?$")
+
+
+def parse_verse_list(text, index):
+    """(sorted unique verse ids, tokens that are not a valid verse) of a Verses value"""
+    vids, invalid = set(), []
+    for token in re.split(r"[,;]", text or ""):
+        token = token.strip()
+        if not token:
+            continue
+        m = _REF.match(token)
+        first = index.vid(int(m.group(1)), int(m.group(2))) if m else 0
+        last = index.vid(int(m.group(1)), int(m.group(3))) if m and m.group(3) else first
+        if not first or not last or last < first:
+            invalid.append(token)
+            continue
+        vids.update(range(first, last + 1))
+    return sorted(vids), invalid
+
+
+def _csr(lists):
+    offsets = array('I', [0])
+    postings = array('I')
+    for items in lists:
+        postings.extend(items)
+        offsets.append(len(postings))
+    return offsets, postings
+
+
+def _le(data):
+    if sys.byteorder != 'little':
+        data = array(data.typecode, data)
+        data.byteswap()
+    return data.tobytes()
+
+
+def build_topic_index(json_path, bin_path, index, rows):
+    """
+    Write topics.json and topic_index.bin from (en, Verses, tags) rows.
+    Returns (topics, postings, invalid references as (topic, token)).
+    """
+    topics, invalid = [], []
+    for en, verses, tags in sorted(rows, key=lambda r: r[0].casefold()):
+        vids, bad = parse_verse_list(verses, index)
+        invalid.extend((en, token) for token in bad)
+        topic = {"id": len(topics), "en": en, "verses": vids}
+        if tags:
+            topic["tags"] = [t.strip() for t in tags.split(",") if t.strip()]
+        topics.append(topic)
+
+    by_verse = [[] for _ in range(len(index) + 1)]
+    for topic in topics:
+        for vid in topic["verses"]:
+            by_verse[vid].append(topic["id"])
+    topic_offsets, verse_postings = _csr(t["verses"] for t in topics)
+    verse_offsets, topic_postings = _csr(by_verse)
+
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump({"topics": topics}, f, ensure_ascii=False, separators=(',', ':'))
+    with open(bin_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(topics), len(index), len(verse_postings), len(topic_postings)))
+        for data in (topic_offsets, verse_postings, verse_offsets, topic_postings):
+            f.write(_le(data))
+    return len(topics), len(verse_postings), invalid
+
+
+class TopicIndex:
+    """O(1) topic -> verses and verse -> topics lookups"""
+
+    def __init__(self, json_path, bin_path):
+        with open(json_path, 'r', encoding='utf-8') as f:
+            self.topics = json.load(f)["topics"]
+        with open(bin_path, 'rb') as f:
+            data = f.read()
+        magic, version, topic_count, verse_count, verse_postings, topic_postings = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION or topic_count != len(self.topics):
+            raise ValueError(f"{bin_path} is not a version {VERSION} topic index for {json_path}")
+        self.verse_count = verse_count
+        pos = HEADER.size
+        sections = []
+        for typecode, count in (('I', topic_count + 1), ('I', verse_postings),
+                                ('I', verse_count + 2), ('I', topic_postings)):
+            section = array(typecode)
+            section.frombytes(data[pos:pos + count * section.itemsize])
+            if sys.byteorder != 'little':
+                section.byteswap()
+            pos += count * section.itemsize
+            sections.append(section)
+        self._topic_offsets, self._verse_postings, self._verse_offsets, self._topic_postings = sections
+
+    def __len__(self):
+        return len(self.topics)
+
+    def verses(self, topic_id):
+        """Sorted verse ids of a topic"""
+        return self._verse_postings[self._topic_offsets[topic_id]:self._topic_offsets[topic_id + 1]]
+
+    def topics_of(self, vid):
+        """Sorted ids of the topics that list verse id vid"""
+        if not 1 <= vid <= self.verse_count:
+            raise KeyError(vid)
+        return self._topic_postings[self._verse_offsets[vid]:self._verse_offsets[vid + 1]]
+
+    def find(self, name):
+        """Topics whose English name or tags contain name (case-insensitive)"""
+        name = name.casefold()
+        return [t for t in self.topics
+                if name in t["en"].casefold() or any(name in tag.casefold() for tag in t.get("tags", ()))]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print(f"usage: {sys.argv[0]} ASSETS_DIR SURA:AYAH|TOPIC")
+        sys.exit(1)
+    from verse_index import VerseIndex
+    base_dir, query = sys.argv[1:]
+    topics = TopicIndex(f"{base_dir}/topics.json", f"{base_dir}/topic_index.bin")
+    if re.match(r"^\d+:\d+$", query):
+        with open(f"{base_dir}/surahs.json", 'r') as f:
+            vid = VerseIndex.from_surahs(json.load(f)).parse(query)
+        for topic_id in topics.topics_of(vid):
+            print(topics.topics[topic_id]["en"])
+    else:
+        for topic in topics.find(query):
+            print(topic["en"], len(topics.verses(topic["id"])))
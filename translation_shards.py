@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Per-translation shards (translations/<name>.json).
+
+Each shard is a JSON array indexed by global verse id (element 0 is null),
+so a client downloads or loads only the translation it shows and looks a
+verse up by position. translations/index.json lists every shard with its
+language and size. The shards are separate from verses_v4.json, which
+keeps only the base translation.
+"""
+import json
+import os
+
+TRANSLATION_DIR = "translations"
+INDEX_NAME = "index.json"
+
+
+def shard_name(name):
+    return f"{TRANSLATION_DIR}/{name}.json"
+
+
+def write_translation_shards(base_dir, translations):
+    """
+    Write one shard per {name: (language, texts)} entry, texts being a list
+    indexed by verse id. Returns the relative names of all files written.
+    """
+    os.makedirs(os.path.join(base_dir, TRANSLATION_DIR), exist_ok=True)
+    written, listing = [], []
+    for name in sorted(translations):
+        language, texts = translations[name]
+        path = shard_name(name)
+        with open(os.path.join(base_dir, path), 'w', encoding='utf-8') as f:
+            json.dump([None] + list(texts[1:]), f, ensure_ascii=False, separators=(',', ':'))
+        written.append(path)
+        listing.append({
+            "name": name,
+            "language": language,
+            "file": path,
+            "bytes": os.path.getsize(os.path.join(base_dir, path)),
+            "verses": sum(1 for text in texts[1:] if text),
+        })
+
+    for entry in os.listdir(os.path.join(base_dir, TRANSLATION_DIR)):
+        path = f"{TRANSLATION_DIR}/{entry}"
+        if entry != INDEX_NAME and path not in written:
+            os.remove(os.path.join(base_dir, path))
+
+    path = f"{TRANSLATION_DIR}/{INDEX_NAME}"
+    with open(os.path.join(base_dir, path), 'w', encoding='utf-8') as f:
+        json.dump({"translations": listing}, f, ensure_ascii=False, separators=(',', ':'))
+    written.append(path)
+    return written
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Integer verse ids and compact word records for the data pipeline.
+
+Verses are addressed by their global ayah index (1 for 1:1 up to 6236 for
+114:6). "sura:ayah" strings are only produced when writing JSON.
+"""
+from array import array
+from bisect import bisect_right
+
+from word_forms import build_forms
+
+
+class VerseIndex:
+    """Maps (sura, ayah) to the global ayah index and back"""
+    __slots__ = ("counts", "starts")
+
+    def __init__(self, counts):
+        # counts[i] = verses in surah i + 1; starts[i] = id of its first verse
+        self.counts = array('I', counts)
+        self.starts = array('I', [1])
+        for count in counts:
+            self.starts.append(self.starts[-1] + count)
+
+    @classmethod
+    def from_surahs(cls, surahs):
+        return cls([s['verses'] for s in sorted(surahs, key=lambda s: s['number'])])
+
+    def __len__(self):
+        return self.starts[-1] - 1
+
+    @property
+    def surah_count(self):
+        return len(self.counts)
+
+    def vid(self, sura, ayah):
+        """Global id of sura:ayah, or 0 if there is no such verse"""
+        if 1 <= sura <= len(self.counts) and 1 <= ayah <= self.counts[sura - 1]:
+            return self.starts[sura - 1] + ayah - 1
+        return 0
+
+    def parse(self, ref):
+        """Global id of a "sura:ayah" string, or 0"""
+        sura, _, ayah = ref.strip().partition(':')
+        if not (sura.isdigit() and ayah.isdigit()):
+            return 0
+        return self.vid(int(sura), int(ayah))
+
+    def ref(self, vid):
+        """(sura, ayah) of a global id"""
+        if not 1 <= vid <= len(self):
+            raise KeyError(vid)
+        sura = bisect_right(self.starts, vid)
+        return sura, vid - self.starts[sura - 1] + 1
+
+    def key(self, vid):
+        sura, ayah = self.ref(vid)
+        return f"{sura}:{ayah}"
+
+    def surah_range(self, sura):
+        """Global ids of every verse in a surah"""
+        return range(self.starts[sura - 1], self.starts[sura])
+
+
+class WordTable:
+    """
+    Word-by-word records for every verse, stored column-wise.
+
+    Words of verse v are rows offsets[v] .. offsets[v + 1] - 1. Rows must be
+    appended in (verse, word) order; verses without words get empty ranges.
+    Repeated Arabic / transliteration strings share one object. translit is
+    the clean transliteration and letters its flat letter-by-letter
+    alignment (see arabic_text.word_letters). intern_forms() numbers the
+    distinct words for the JSON output (see word_forms).
+    """
+    __slots__ = ("offsets", "ids", "arabic", "translit", "letters", "forms", "form_ids", "_strings")
+
+    def __init__(self):
+        self.offsets = array('I', [0, 0])
+        self.ids = array('H')
+        self.arabic = []
+        self.translit = []
+        self.letters = []
+        self.forms = []
+        self.form_ids = None
+        self._strings = {}
+
+    def _intern(self, text):
+        return self._strings.setdefault(text, text)
+
+    def append(self, vid, word_id, arabic, translit, letters=()):
+        while len(self.offsets) <= vid + 1:
+            self.offsets.append(len(self.ids))
+        if len(self.offsets) > vid + 2:
+            raise ValueError("words must be appended in verse order")
+        self.ids.append(word_id)
+        self.arabic.append(self._intern(arabic))
+        self.translit.append(self._intern(translit))
+        self.letters.append(letters)
+        self.offsets[vid + 1] = len(self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def rows(self, vid):
+        if vid + 1 >= len(self.offsets):
+            return range(0)
+        return range(self.offsets[vid], self.offsets[vid + 1])
+
+    def intern_forms(self):
+        """Number the distinct (arabic, translit, letters) words by frequency"""
+        self.forms, self.form_ids = build_forms(zip(self.arabic, self.translit, self.letters))
+
+    def to_json(self, vid):
+        """The verse's words as the form ids written to verses_v4.json"""
+        return [self.form_ids[i] for i in self.rows(vid)]
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Per-surah (and optionally per-juz) shards of verses_v4.json.
+
+Each shard holds the verse objects for one surah or one juz, and
+verses/index.json lists every shard with its byte size and verse range so
+a consumer can load only the part being read. Words are form ids into
+word_forms.json, which a consumer loads once for all shards.
+"""
+import json
+import os
+
+from navigation import JUZ_STARTS
+
+SHARD_DIR = "verses"
+INDEX_NAME = "index.json"
+
+
+def surah_shard_name(sura_num):
+    return f"{SHARD_DIR}/surah_{sura_num}.json"
+
+
+def juz_shard_name(juz_num):
+    return f"{SHARD_DIR}/juz_{juz_num}.json"
+
+
+def juz_ranges(surahs):
+    """(juz, (start_sura, start_ayah), (end_sura, end_ayah)) for every juz"""
+    counts = {s['number']: s['verses'] for s in surahs}
+    last_sura = max(counts)
+    ranges = []
+    for i, start in enumerate(JUZ_STARTS):
+        if i + 1 < len(JUZ_STARTS):
+            next_sura, next_ayah = JUZ_STARTS[i + 1]
+            end = (next_sura, next_ayah - 1) if next_ayah > 1 else (next_sura - 1, counts[next_sura - 1])
+        else:
+            end = (last_sura, counts[last_sura])
+        ranges.append((i + 1, start, end))
+    return ranges
+
+
+def juz_verses(combined_verses, start, end):
+    """Verse objects between two (sura, ayah) bounds, grouped by surah"""
+    shard = {}
+    for sura_num in range(start[0], end[0] + 1):
+        first = start[1] if sura_num == start[0] else 1
+        verses = combined_verses[str(sura_num)]
+        last = end[1] if sura_num == end[0] else len(verses)
+        shard[str(sura_num)] = verses[first - 1:last]
+    return shard
+
+
+def _dump(base_dir, name, data):
+    with open(os.path.join(base_dir, name), 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+
+
+def write_shards(base_dir, combined_verses, surahs, dirty=None, juz=False):
+    """
+    Write surah (and juz) shards plus the index manifest.
+
+    dirty limits rewriting to the given surah numbers (and the ajza'
+    overlapping them); None rewrites everything. Returns the relative names
+    of all files written.
+    """
+    os.makedirs(os.path.join(base_dir, SHARD_DIR), exist_ok=True)
+    written = []
+    index = {"surahs": [], "juz": []}
+    start = 1
+    for sura in surahs:
+        sura_num = sura['number']
+        name = surah_shard_name(sura_num)
+        if dirty is None or sura_num in dirty:
+            _dump(base_dir, name, combined_verses[str(sura_num)])
+            written.append(name)
+        index["surahs"].append({
+            "surah": sura_num,
+            "file": name,
+            "bytes": os.path.getsize(os.path.join(base_dir, name)),
+            "verses": sura['verses'],
+            "start": start,
+        })
+        start += sura['verses']
+
+    if juz:
+        for juz_num, first, last in juz_ranges(surahs):
+            name = juz_shard_name(juz_num)
+            touched = dirty is None or any(first[0] <= s <= last[0] for s in dirty)
+            if touched or not os.path.exists(os.path.join(base_dir, name)):
+                _dump(base_dir, name, juz_verses(combined_verses, first, last))
+                written.append(name)
+            index["juz"].append({
+                "juz": juz_num,
+                "file": name,
+                "bytes": os.path.getsize(os.path.join(base_dir, name)),
+                "first": f"{first[0]}:{first[1]}",
+                "last": f"{last[0]}:{last[1]}",
+            })
+
+    name = f"{SHARD_DIR}/{INDEX_NAME}"
+    _dump(base_dir, name, index)
+    written.append(name)
+    return written
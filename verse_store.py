@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Compact binary verse store (verses_v4.bin) and its memory-mapped reader.
+
+Layout (little-endian):
+    header        magic, version, surah count, verse count, section offsets
+    surah table   (surahs + 1) x u32 index of each surah's first verse
+    verse table   verses x u32 absolute offset of the verse record
+    records       ayah u16, text u32, translation u32, flags u8, words u16,
+                  then per word: id u16, arabic u32, translit u32, letters u32
+    string table  strings x (offset u32, length u32) into the pool
+    string pool   deduplicated UTF-8 strings
+
+String fields are ids into the string table, so a lookup only touches the
+few bytes of one record and the strings it references. A word's letters
+list is stored as its compact JSON text.
+"""
+import json
+import mmap
+import struct
+import sys
+
+MAGIC = b"QVST"
+VERSION = 2
+
+HEADER = struct.Struct("<4sHHIIIIII")
+RECORD = struct.Struct("<HIIBH")
+WORD = struct.Struct("<HIII")
+U32 = struct.Struct("<I")
+STRING = struct.Struct("<II")
+
+FLAG_IHYA = 1
+
+
+def write_verse_store(path, combined_verses, surahs):
+    """Pack verse objects with inline word records (word_forms.decode_verses) into path"""
+    strings = {}
+    pool = bytearray()
+    spans = []
+
+    def intern(text):
+        sid = strings.get(text)
+        if sid is None:
+            data = text.encode('utf-8')
+            sid = strings[text] = len(spans)
+            spans.append((len(pool), len(data)))
+            pool.extend(data)
+        return sid
+
+    surah_starts = [0]
+    records = bytearray()
+    record_offsets = []
+    for sura in surahs:
+        verses = combined_verses[str(sura['number'])]
+        for verse in verses:
+            record_offsets.append(len(records))
+            words = verse['words']
+            records += RECORD.pack(
+                verse['ayah'],
+                intern(verse['text'] or ""),
+                intern(verse['translation'] or ""),
+                FLAG_IHYA if verse['hasIhya'] else 0,
+                len(words),
+            )
+            for w in words:
+                letters = json.dumps(w['letters'], ensure_ascii=False, separators=(',', ':'))
+                records += WORD.pack(w['id'], intern(w['arabic']), intern(w['translit']), intern(letters))
+        surah_starts.append(surah_starts[-1] + len(verses))
+
+    verse_count = len(record_offsets)
+    surah_table_off = HEADER.size
+    verse_table_off = surah_table_off + U32.size * len(surah_starts)
+    records_off = verse_table_off + U32.size * verse_count
+    string_table_off = records_off + len(records)
+    pool_off = string_table_off + STRING.size * len(spans)
+
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(surahs), verse_count, surah_table_off,
+                            verse_table_off, string_table_off, len(spans), pool_off))
+        f.write(struct.pack(f"<{len(surah_starts)}I", *surah_starts))
+        f.write(struct.pack(f"<{verse_count}I", *(records_off + o for o in record_offsets)))
+        f.write(records)
+        for span in spans:
+            f.write(STRING.pack(*span))
+        f.write(pool)
+    return verse_count
+
+
+class VerseStore:
+    """Random access to verses_v4.bin without parsing the whole file"""
+
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, self.surah_count, self.verse_count, self._surah_table,
+         self._verse_table, self._string_table, self.string_count,
+         self._pool) = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a version {VERSION} verse store")
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.verse_count
+
+    def string(self, sid):
+        offset, length = STRING.unpack_from(self._mm, self._string_table + sid * STRING.size)
+        start = self._pool + offset
+        return self._mm[start:start + length].decode('utf-8')
+
+    def index(self, sura, ayah):
+        """0-based global index of sura:ayah"""
+        if not 1 <= sura <= self.surah_count:
+            raise KeyError(f"{sura}:{ayah}")
+        first, end = struct.unpack_from("<II", self._mm, self._surah_table + (sura - 1) * U32.size)
+        if not 1 <= ayah <= end - first:
+            raise KeyError(f"{sura}:{ayah}")
+        return first + ayah - 1
+
+    def verse(self, sura, ayah):
+        """The verse object for sura:ayah, shaped like an entry of verses_v4.json with its words expanded"""
+        (offset,) = U32.unpack_from(self._mm, self._verse_table + self.index(sura, ayah) * U32.size)
+        ayah, text_id, translation_id, flags, word_count = RECORD.unpack_from(self._mm, offset)
+        offset += RECORD.size
+        words = []
+        for _ in range(word_count):
+            word_id, arabic_id, translit_id, letters_id = WORD.unpack_from(self._mm, offset)
+            offset += WORD.size
+            words.append({
+                "id": word_id,
+                "arabic": self.string(arabic_id),
+                "translit": self.string(translit_id),
+                "letters": json.loads(self.string(letters_id)),
+            })
+        return {
+            "ayah": ayah,
+            "text": self.string(text_id),
+            "translation": self.string(translation_id),
+            "words": words,
+            "hasIhya": bool(flags & FLAG_IHYA),
+        }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print(f"usage: {sys.argv[0]} verses_v4.bin SURA:AYAH")
+        sys.exit(1)
+    sura, ayah = (int(x) for x in sys.argv[2].split(':'))
+    with VerseStore(sys.argv[1]) as store:
+        print(json.dumps(store.verse(sura, ayah), ensure_ascii=False, indent=2))
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Interned word-by-word forms.
+
+verses_v4.json and the verse shards store each verse's words as a list of
+form ids; word_forms.json holds the forms themselves as
+[arabic, translit, letters] rows, most frequent first so the common words
+get the shortest ids. A word's id within its verse is its position + 1.
+Frequent words (فِى, ٱلَّذِينَ, مِن ...) occur hundreds of times, so every
+distinct word is written and parsed once instead of per occurrence.
+"""
+import json
+import sys
+from array import array
+
+FORMS_NAME = "word_forms.json"
+FIELDS = ("arabic", "translit", "letters")
+
+
+def build_forms(words):
+    """
+    (forms, ids) for an iterable of (arabic, translit, letters) words in
+    verse order: the distinct forms by descending frequency (first
+    occurrence breaks ties) and the form id of every word.
+    """
+    first, counts, keys = {}, {}, []
+    for arabic, translit, letters in words:
+        key = (arabic, translit, tuple(letters))
+        if key not in first:
+            first[key] = len(first)
+            counts[key] = 0
+        counts[key] += 1
+        keys.append(key)
+    forms = sorted(first, key=lambda key: (-counts[key], first[key]))
+    form_ids = {key: i for i, key in enumerate(forms)}
+    return forms, array('I', (form_ids[key] for key in keys))
+
+
+def encode_verses(combined_verses):
+    """
+    (forms, verses) from verse objects with inline word records: the form
+    dictionary and a copy of the verses whose words are form ids.
+    """
+    words = (tuple(w[field] for field in FIELDS)
+             for verses in combined_verses.values() for verse in verses for w in verse['words'])
+    forms, ids = build_forms(words)
+    encoded, i = {}, 0
+    for sura, verses in combined_verses.items():
+        encoded[sura] = []
+        for verse in verses:
+            count = len(verse['words'])
+            encoded[sura].append({**verse, "words": ids[i:i + count].tolist()})
+            i += count
+    return forms, encoded
+
+
+def decode_words(forms, form_ids):
+    """Word records of one verse, as written before interning"""
+    return [{"id": i, "arabic": forms[f][0], "translit": forms[f][1], "letters": list(forms[f][2])}
+            for i, f in enumerate(form_ids, 1)]
+
+
+def decode_verses(forms, combined_verses):
+    """Inverse of encode_verses: a copy of the verses with inline word records"""
+    return {sura: [{**verse, "words": decode_words(forms, verse['words'])} for verse in verses]
+            for sura, verses in combined_verses.items()}
+
+
+def write_forms(path, forms):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({"fields": FIELDS, "forms": [[arabic, translit, list(letters)] for arabic, translit, letters in forms]},
+                  f, ensure_ascii=False, separators=(',', ':'))
+    return len(forms)
+
+
+def load_forms(path):
+    """[(arabic, translit, letters)] of a word_forms.json"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [(arabic, translit, tuple(letters)) for arabic, translit, letters in json.load(f)["forms"]]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print(f"usage: {sys.argv[0]} word_forms.json FORM_ID")
+        sys.exit(1)
+    arabic, translit, letters = load_forms(sys.argv[1])[int(sys.argv[2])]
+    print(f"{arabic}  {translit}  {letters}")